@@ -4,19 +4,15 @@ gdl_path = os.path.abspath(os.path.join(curr_dir, os.pardir))
 sys.path.append(gdl_path)
 
 from gdl import Lexer, Parser, Database, DatalogError, ParseError
+from gdl.parallel import load_files
 
 DEFINE = 'GDL> '
 QUERY = 'GDL? '
 prompt = DEFINE
 database = Database()
 
-for filename in sys.argv[1:]:
-    # read in any files from the command line
-    with open(filename, 'r') as file:
-        tokens = Lexer.run_lex(file=file)
-    for tree in Parser.run_parse(tokens):
-#        print(tree)
-        database.define(tree)
+# read in any files from the command line, parsing them in parallel
+load_files(database, sys.argv[1:])
 
 try:
     # interactive loop
@@ -56,13 +52,11 @@ try:
                 continue
 
             if type(results) == list:
-                output = ''
+                # substitute each answer into the query and print it as it
+                # is rendered, rather than building all of the output first
                 for match in results:
-                    new_string = raw_string.lower()
-                    for key in match:
-                        new_string = new_string.replace(key, repr(match[key]))
-                    output += new_string + '\n'
-                print(output)
+                    print(trees[0].set_variables(match))
+                print('')
             else:
                 print(results)
 
@@ -0,0 +1,68 @@
+# A stand-in game manager for testing players locally:
+#
+#   python bin/gamemanager.py GAME.kif STARTCLOCK PLAYCLOCK HOST:PORT...
+#
+# One player address is given per role, in the order of the game's role/1
+# facts.  Illegal or late moves are replaced with a random legal move.
+import os, sys
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+gdl_path = os.path.abspath(os.path.join(curr_dir, os.pardir))
+sys.path.append(gdl_path)
+
+import random
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from gdl import StateMachine
+
+if len(sys.argv) < 5:
+    print('usage: %s GAME.kif STARTCLOCK PLAYCLOCK HOST:PORT...' % sys.argv[0])
+    sys.exit(1)
+
+filename, startclock, playclock = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+addresses = sys.argv[4:]
+with open(filename, 'r') as file:
+    rules = file.read()
+fsm = StateMachine()
+fsm.store(data=rules)
+if len(addresses) != len(fsm.roles):
+    print('expected %d players, one for each of: %s' % (len(fsm.roles), ' '.join(fsm.roles)))
+    sys.exit(1)
+
+match_id = 'match%d' % random.getrandbits(32)
+description = ' '.join(line.split(';')[0] for line in rules.splitlines())
+
+
+def send(address, message, timeout):
+    request = urllib.request.Request('http://%s/' % address, message.encode('utf-8'),
+            {'Content-Type': 'text/acl'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout + 1) as response:
+            return response.read().decode('utf-8').strip()
+    except OSError:
+        return None
+
+
+def broadcast(messages, timeout):
+    with ThreadPoolExecutor(len(addresses)) as pool:
+        return list(pool.map(send, addresses, messages, [timeout] * len(addresses)))
+
+
+broadcast(['(start %s %s (%s) %d %d)' % (match_id, role, description, startclock, playclock)
+        for role in fsm.roles], startclock)
+moves = 'nil'
+while not fsm.is_terminal():
+    replies = broadcast(['(play %s %s)' % (match_id, moves)] * len(fsm.roles), playclock)
+    played = []
+    for role, reply in zip(fsm.roles, replies):
+        try:
+            fsm.move(role, reply)
+        except Exception:
+            reply = str(random.choice(fsm.legal_moves(role)))
+            fsm.move(role, reply)
+        played.append(reply)
+        print('%s: %s' % (role, reply))
+    moves = '(%s)' % ' '.join(played)
+    fsm = fsm.next()
+
+broadcast(['(stop %s %s)' % (match_id, moves)] * len(fsm.roles), playclock)
+print(fsm.score())
@@ -0,0 +1,24 @@
+import os, sys
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+gdl_path = os.path.abspath(os.path.join(curr_dir, os.pardir))
+sys.path.append(gdl_path)
+
+import asyncio
+from gdl.cache import GameCache
+from gdl.player import Player
+
+port = int(sys.argv[1]) if len(sys.argv) > 1 else 9147
+cache = GameCache(sys.argv[2]) if len(sys.argv) > 2 else None
+
+
+async def main():
+    player = Player(cache=cache)
+    server = await player.serve(host='0.0.0.0', port=port)
+    print('listening on port %d' % port)
+    async with server:
+        await server.serve_forever()
+
+try:
+    asyncio.run(main())
+except KeyboardInterrupt:
+    print('')
@@ -1,4 +1,4 @@
 from gdl.database import Database, DatalogError
 from gdl.lexer import Lexer, NoInputError
 from gdl.parser import Parser, ParseError
-from gdl.state_machine import StateMachine, GameError
+from gdl.state_machine import Game, StateMachine, GameError, PlayoutReport
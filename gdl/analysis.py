@@ -0,0 +1,198 @@
+class Latch(object):
+    def __init__(self, pattern, conditions):
+        '''A 'next' rule which keeps every 'true' fact matching pattern true.
+
+        conditions is a list of (variable, constant) pairs from the rule's
+        (distinct ?var constant) literals; a matching fact only persists if
+        its value for each variable differs from the constant.
+        '''
+        self.pattern = pattern
+        self.conditions = conditions
+
+    def covers(self, node):
+        '''Return whether or not every ground instance of node is kept true by
+        this latch.
+        '''
+        bindings = _instance_of(node, self.pattern, {})
+        if bindings is None:
+            return False
+        for variable, constant in self.conditions:
+            value = bindings.get(variable)
+            if value is None or not value.is_constant() or value == constant:
+                return False
+        return True
+
+    def __repr__(self):
+        return '<Latch %r>' % self.pattern
+
+
+class GameAnalysis(object):
+    def __init__(self, game):
+        '''Analyze the rules of a compiled Game.
+
+        Attributes:
+        static_predicates -- rule predicates which never change during a game
+        latches -- Latch objects; a matching fact stays true once it is true
+        inhibitors -- patterns of facts which stay false once they are false
+        constants -- initial facts which stay true for the whole game
+        goals_monotone -- True if a goal which holds now will hold in every
+            later state, because the goal rules only depend on latched facts,
+            inhibited facts being false, and static relations
+        '''
+        self.game = game
+        self.db = game.db
+        self.static_predicates = set(game.static_predicates())
+        rules = self.db.rules.get(('next', 1), [])
+        persistent = [(args[0], body) for args, body in rules if _persists(args[0], body)]
+        self.latches = self._find_latches(persistent)
+        self.inhibitors = self._find_inhibitors(persistent, rules)
+        self.constants = [args[0] for args in self.db.facts.get(('true', 1), []) \
+                if self.is_latched(args[0])]
+        self.goals_monotone = ('goal', 2) in self.db.rules and \
+                self._monotone(('goal', 2), set())
+
+    ## PUBLIC API
+
+    def is_latched(self, node):
+        '''Return whether or not facts matching node stay true once true.'''
+        return any(latch.covers(node) for latch in self.latches)
+
+    def is_inhibited(self, node):
+        '''Return whether or not facts matching node stay false once false.'''
+        return any(_instance_of(node, pattern, {}) is not None \
+                for pattern in self.inhibitors)
+
+    def decided_goals(self, machine):
+        '''Return the scores of every player if they can no longer change in
+        the rest of the game, or None.  The game need not be over yet, so a
+        search can cut the branch off.
+        '''
+        if not self.goals_monotone:
+            return None
+        goals = machine.score()
+        if goals is None or set(goals) != machine.players:
+            return None
+        return goals
+
+    ## HELPERS
+
+    def _find_latches(self, persistent):
+        latches = []
+        for head, body in persistent:
+            conditions = []
+            for literal in body:
+                if literal.is_distinct():
+                    a, b = literal.children
+                    if a.is_variable() and not b.is_variable() and b.arity == 0:
+                        conditions.append((a.term, b))
+                        continue
+                    if b.is_variable() and not a.is_variable() and a.arity == 0:
+                        conditions.append((b.term, a))
+                        continue
+                    break
+                elif not (literal.term == 'true' and literal.children[0] == head):
+                    break
+            else:
+                latches.append(Latch(head, conditions))
+        return latches
+
+    def _find_inhibitors(self, persistent, rules):
+        '''A pattern is inhibited if the only 'next' rules which can make a
+        matching fact true require it to be true already.
+        '''
+        others = [args[0] for args, body in rules if not _persists(args[0], body)]
+        patterns = []
+        for head, _ in persistent:
+            if any(pattern == head for pattern in patterns):
+                continue
+            if not any(_unify(head, 0, other, 1, {}) for other in others):
+                patterns.append(head)
+        return patterns
+
+    def _monotone(self, pred, visited):
+        '''Return whether or not every rule for pred only depends on facts
+        which can never stop holding.
+        '''
+        if pred in visited:
+            return True
+        visited.add(pred)
+        for _, body in self.db.rules.get(pred, []):
+            for literal in body:
+                if not self._monotone_literal(literal, visited):
+                    return False
+        return True
+
+    def _monotone_literal(self, literal, visited):
+        if literal.is_distinct():
+            return True
+        if literal.is_or():
+            return all(self._monotone_literal(x, visited) for x in literal.children)
+        if literal.is_not():
+            inner = literal.children[0]
+            if inner.term == 'true' and inner.arity == 1:
+                return self.is_inhibited(inner.children[0])
+            return inner.term != 'does' and (inner.predicate in self.static_predicates \
+                    or inner.predicate not in self.db.rules)
+        if literal.term == 'true' and literal.arity == 1:
+            return self.is_latched(literal.children[0])
+        if literal.term == 'does':
+            return False
+        if literal.predicate in self.static_predicates or \
+                literal.predicate not in self.db.rules:
+            return True
+        return self._monotone(literal.predicate, visited)
+
+
+def _persists(head, body):
+    '''Return whether or not a 'next' rule requires its own head to be
+    true already.
+    '''
+    return any(literal.term == 'true' and literal.arity == 1 and \
+            literal.children[0] == head for literal in body)
+
+
+def _instance_of(node, pattern, bindings):
+    '''Match pattern against node, binding the variables of pattern.  Return
+    the bindings if every instance of node is an instance of pattern, or None.
+    '''
+    stack = [(node, pattern)]
+    while stack:
+        node, pattern = stack.pop()
+        if pattern.is_variable():
+            bound = bindings.get(pattern.term)
+            if bound is None:
+                bindings[pattern.term] = node
+            elif bound != node:
+                return None
+        elif node.is_variable() or node.predicate != pattern.predicate:
+            return None
+        else:
+            stack.extend(zip(node.children, pattern.children))
+    return bindings
+
+
+def _walk(node, side, subst):
+    while node.is_variable() and (side, node.term) in subst:
+        node, side = subst[(side, node.term)]
+    return node, side
+
+
+def _unify(a, side_a, b, side_b, subst):
+    '''Return whether or not two terms unify.  The variables of each term
+    are kept apart by the side they come from.
+    '''
+    stack = [(a, side_a, b, side_b)]
+    while stack:
+        a, side_a, b, side_b = stack.pop()
+        a, side_a = _walk(a, side_a, subst)
+        b, side_b = _walk(b, side_b, subst)
+        if a.is_variable():
+            if not (b.is_variable() and (side_a, a.term) == (side_b, b.term)):
+                subst[(side_a, a.term)] = (b, side_b)
+        elif b.is_variable():
+            subst[(side_b, b.term)] = (a, side_a)
+        elif a.predicate != b.predicate:
+            return False
+        else:
+            stack.extend((x, side_a, y, side_b) for x, y in zip(a.children, b.children))
+    return True
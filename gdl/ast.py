@@ -53,34 +53,49 @@ class ASTNode(object):
 
     def copy(self):
         head = ASTNode(self.token.copy())
-        head.children = [child.copy() for child in self.children]
+        stack = [(self, head)]
+        while stack:
+            node, copy = stack.pop()
+            copy.children = [ASTNode(child.token.copy()) for child in node.children]
+            stack.extend(zip(node.children, copy.children))
         return head
 
     def set_variables(self, variable_dict):
         if self.is_variable():
-            copy = variable_dict[self.term].copy()
-        else:
-            copy = ASTNode(self.token.copy())
-            copy.children = [child.set_variables(variable_dict) \
-                    for child in self.children]
-        return copy
+            return variable_dict[self.term].copy()
+        head = ASTNode(self.token.copy())
+        stack = [(self, head)]
+        while stack:
+            node, copy = stack.pop()
+            for child in node.children:
+                if child.is_variable():
+                    copy.children.append(variable_dict[child.term].copy())
+                else:
+                    stack.append((child, copy.create_child(child.token.copy())))
+        return head
 
     def __eq__(self, other):
-        if self.predicate != other.predicate:
-            return False
-        for a, b in zip(self.children, other.children):
-            if a != b:
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if a.predicate != b.predicate:
                 return False
+            stack.extend(zip(a.children, b.children))
         return True
 
     def __repr__(self):
-        ret = ''
-        if self.arity > 0:
-            ret += '('
-        ret += self.term
-        for child in self.children:
-            ret += ' '
-            ret += repr(child)
-        if self.arity > 0:
-            ret += ')'
-        return ret
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if type(node) is str:
+                parts.append(node)
+            elif node.children:
+                parts.append('(' + node.term)
+                stack.append(')')
+                for child in reversed(node.children):
+                    stack.append(child)
+                    stack.append(' ')
+            else:
+                parts.append(node.term)
+        return ''.join(parts)
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from gdl.ast import ASTNode
+from gdl.database import Database
+from gdl.lexer import NoInputError
+from gdl.state_machine import Game
+
+
+# bump whenever the layout written by dump_database() changes
+FORMAT = 2
+
+
+def dump_database(database):
+    '''Serialize the rules, facts, requirements and derived facts of a
+    Database.  Terms are written as flat tuples (see _encode()), without
+    their source positions.
+    '''
+    encode = lambda facts: dict((pred, [tuple(_encode(x) for x in args) for args in table]) \
+            for pred, table in facts.items())
+    rules = dict((pred, [(tuple(_encode(x) for x in args), tuple(_encode(x) for x in body)) \
+            for args, body in table]) for pred, table in database.rules.items())
+    data = (FORMAT, encode(database.facts), rules, database.requirements,
+            encode(database.derived_facts))
+    return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+
+def load_database(data):
+    '''Rebuild a Database written by dump_database().  The rules were
+    validated when they were first defined, so they are not checked again.
+    Equal terms share one ASTNode, so the terms must not be modified.
+
+    Raise ValueError if data was written in another format.
+    '''
+    format, facts, rules, requirements, derived_facts = pickle.loads(data)
+    if format != FORMAT:
+        raise ValueError('unknown cache format: %r' % format)
+    nodes = {}
+    def decode(key):
+        try:
+            return nodes[key]
+        except KeyError:
+            node = nodes[key] = _decode(key)
+            return node
+    decode_facts = lambda table: dict((pred, [[decode(x) for x in args] for args in rows]) \
+            for pred, rows in table.items())
+    db = Database()
+    db.facts = decode_facts(facts)
+    db.derived_facts = decode_facts(derived_facts)
+    db.rules = dict((pred, [([decode(x) for x in args], [decode(x) for x in body]) \
+            for args, body in table]) for pred, table in rules.items())
+    db.requirements = requirements
+    return db
+
+
+def _encode(node):
+    '''Encode a term as a flat tuple holding the value and arity of every
+    node in preorder, which pickles without recursion at any depth.
+    '''
+    ret = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        ret.append(node.term)
+        ret.append(len(node.children))
+        stack.extend(reversed(node.children))
+    return tuple(ret)
+
+
+def _decode(key):
+    '''Rebuild a term encoded by _encode().  Walking the tuple backwards,
+    the children of every node have been built by the time it is reached.
+    '''
+    nodes = []
+    for i in range(len(key) - 2, -1, -2):
+        node = ASTNode.new(key[i])
+        arity = key[i + 1]
+        if arity:
+            node.children = nodes[:-arity - 1:-1]
+            del nodes[-arity:]
+        nodes.append(node)
+    return nodes[0]
+
+
+class GameCache(object):
+    def __init__(self, directory):
+        '''A directory of compiled games, each stored in one file named after
+        a hash of its GDL source.  A changed source hashes to a new name, so
+        stale entries are never loaded.
+        '''
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    ## PUBLIC API
+
+    def game(self, data=None, files=None):
+        '''Return the compiled Game for GDL source given as a string or as a
+        list of file names.  Load it from the cache if it is there;
+        otherwise compile it and add it to the cache.
+
+        Raise NoInputError if neither data nor files is given.
+        '''
+        if files is not None:
+            contents = []
+            for filename in files:
+                with open(filename, 'r') as file:
+                    contents.append(file.read())
+            data = '\n'.join(contents)
+        if data is None:
+            raise NoInputError('no input to valueize')
+        path = self.path(data)
+        game = self._load(path)
+        if game is not None:
+            self.hits += 1
+            return game
+        self.misses += 1
+        game = Game(data=data)
+        self._store(path, game)
+        return game
+
+    def path(self, data):
+        '''Return the cache file name for GDL source.'''
+        digest = hashlib.sha256(('%d\n' % FORMAT + data).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + '.gdlc')
+
+    ## HELPERS
+
+    def _load(self, path):
+        '''Return the Game in a cache file, or None if it is missing or
+        unreadable.
+        '''
+        try:
+            with open(path, 'rb') as file:
+                db = load_database(file.read())
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return None
+        game = Game(db)
+        game.compile()
+        return game
+
+    def _store(self, path, game):
+        '''Write a cache file atomically, so that concurrent processes never
+        read half of one.
+        '''
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(dump_database(game.db))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -40,6 +40,24 @@ class Database(object):
         self.facts.setdefault(pred, []).append(args)
         self._delete_derived_facts(pred)
 
+    def replace_facts(self, term, arity, facts):
+        '''Replace every fact for a predicate with a new list of facts.
+
+        Unlike define_fact(), the arguments are not sanity checked:  each fact
+        is expected to be a list of ground ASTNodes such as those returned by
+        query().  Only the derived facts which depend on the predicate are
+        deleted.
+        '''
+        pred = (term, arity)
+        self.facts[pred] = facts
+        self._delete_derived_facts(pred)
+
+    def retract_facts(self, term, arity):
+        '''Remove every fact for a predicate from the database.'''
+        pred = (term, arity)
+        self.facts.pop(pred, None)
+        self._delete_derived_facts(pred)
+
     def define_rule(self, term, arity, args, body):
         '''Define a datalog rule for the database.
 
@@ -90,6 +108,45 @@ class Database(object):
         results = facts + derived_facts
         return results if results else False
 
+    def matching_facts(self, ast_head):
+        '''Return the stored and derived facts which match the query as a
+        list of argument lists.  Unlike query(), no variable bindings are
+        built and the facts are not copied, so they must not be modified.
+
+        Raise DatalogError if the predicate being queried does not exist.
+        '''
+        return list(self.iter_matching_facts(ast_head))
+
+    def iter_matching_facts(self, ast_head):
+        '''Like matching_facts(), but return an iterator which yields the
+        matching facts one at a time as the tables are scanned.
+
+        Raise DatalogError if the predicate being queried does not exist.
+        '''
+        pred = ast_head.predicate
+        if pred not in self.facts and pred not in self.rules:
+            raise DatalogError(GDLError.NO_PREDICATE % pred, ast_head.token)
+        if pred in self.rules and pred not in self.derived_facts:
+            self._derive_facts(pred, ast_head.children)
+        pattern = _flatten(ast_head.children)
+        return (args for table in (self.facts.get(pred, []), self.derived_facts.get(pred, [])) \
+                for args in table if self._matches(pattern, args, {}))
+
+    def attach(self, snapshot):
+        '''Use the relations of a gdl.snapshot.Snapshot as facts.  They are
+        read in place from the snapshot and cannot be added to, and any
+        facts already defined for their predicates are replaced.
+        '''
+        for pred, relation in snapshot.relations.items():
+            self.facts[pred] = relation
+            self._delete_derived_facts(pred)
+
+    def dependents(self, term, arity):
+        '''Return the set of rule predicates which depend on the predicate,
+        directly or through other rules.
+        '''
+        return set(self._collect_requirements((term, arity), []))
+
     def copy(self):
         '''Return a copy of this database.'''
         copy = Database()
@@ -112,12 +169,13 @@ class Database(object):
         return pos + neg
 
     def _contains_negative(self, literal):
-        '''Recursively determine if a literal contains a 'not' or 'distinct'.'''
-        if literal.is_not() or literal.is_distinct():
-            return True
-        for child in literal.children:
-            if self._contains_negative(child):
+        '''Determine if a literal contains a 'not' or 'distinct'.'''
+        stack = [literal]
+        while stack:
+            node = stack.pop()
+            if node.is_not() or node.is_distinct():
                 return True
+            stack.extend(node.children)
         return False
 
     ### DETERMINE RULE DEPENDENCIES:
@@ -131,18 +189,20 @@ class Database(object):
             self._add_to_requirements(rule, sentence)
 
     def _add_to_requirements(self, pred, rule):
-        '''Recursively add sentence predicate to head mappings.'''
-        if rule.is_not():
-            self._add_to_requirements(pred, rule.children[0])
-        elif rule.is_or():
-            self._add_to_requirements(pred, rule.children[0])
-            self._add_to_requirements(pred, rule.children[1])
-        elif rule.is_distinct():
-            for child in rule.children:
-                if child.is_constant():
-                    self._add_to_requirements(pred, child)
-        elif rule.predicate != pred:
-            self.requirements.setdefault(rule.predicate, set()).add(pred)
+        '''Add sentence predicate to head mappings, looking inside 'not',
+        'or' and 'distinct'.
+        '''
+        stack = [rule]
+        while stack:
+            rule = stack.pop()
+            if rule.is_not():
+                stack.append(rule.children[0])
+            elif rule.is_or():
+                stack.extend(rule.children[:2])
+            elif rule.is_distinct():
+                stack.extend(child for child in rule.children if child.is_constant())
+            elif rule.predicate != pred:
+                self.requirements.setdefault(rule.predicate, set()).add(pred)
 
     def _delete_derived_facts(self, pred):
         '''Delete derived facts for all rules for which pred is a dependency.'''
@@ -174,44 +234,67 @@ class Database(object):
         return a list of matching facts.
         '''
         results = []
+        candidates = getattr(table, 'candidates', None)
+        if candidates is not None:
+            table = candidates(query, variables)
+        pattern = _flatten(query)
         for args in table:
-            match = self._compare_fact(query, args, variables)
+            match = self._compare_fact(query, args, variables, pattern)
             if match is True:
                 return True
             elif match:
                 results.append(match)
         return results
 
-    def _compare_fact(self, query_args, fact_args, variables=None):
-        '''Recursively walk the arguments in the fact_args looking for a match.
+    def _compare_fact(self, query_args, fact_args, variables=None, pattern=None):
+        '''Walk the arguments in the fact_args looking for a match.
 
-        If the query contains a variable and that variable has already been
-        seen, make sure the new value matches the stored value.  If the
-        variable has not been seen yet, then store it.  Otherwise compare
-        atoms in the tree.
+        The query is scanned in its flattened form (see _flatten(), pass
+        pattern to reuse one across facts) while the fact is walked in the
+        same preorder.  If the query contains a variable and that variable
+        has already been seen, make sure the new value matches the stored
+        value.  If the variable has not been seen yet, then store it.
+        Otherwise compare atoms in the tree.
 
         Return False if at any point a fact does match the query.  Return True
         if the query contained no variables.  Otherwise return the list of
         matches found.
         '''
+        if pattern is None:
+            pattern = _flatten(query_args)
         matches = variables.copy() if variables is not None else {}
-        for query, fact in zip(query_args, fact_args):
-            if query.is_variable():
-                if query.term in matches:
-                    if matches[query.term] != fact:
+        stack = list(reversed(fact_args))
+        for term, arity, variable in pattern:
+            fact = stack.pop()
+            if variable:
+                if term in matches:
+                    if matches[term] != fact:
                         return False
                 else:
-                    matches[query.term] = fact.copy()
-            elif query.predicate == fact.predicate:
-                result = self._compare_fact(query.children, fact.children, matches)
-                if type(result) is dict:
-                    matches.update(result)
-                elif result is False:
-                    return False
-            else:
+                    matches[term] = fact.copy()
+            elif term != fact.term or arity != len(fact.children):
                 return False
+            elif arity:
+                stack.extend(reversed(fact.children))
         return matches if matches else True
 
+    def _matches(self, pattern, fact_args, bindings):
+        '''Return whether or not the fact arguments match the flattened
+        query, like _compare_fact() but without copying the bound values.
+        '''
+        stack = list(reversed(fact_args))
+        for term, arity, variable in pattern:
+            fact = stack.pop()
+            if variable:
+                bound = bindings.setdefault(term, fact)
+                if bound is not fact and bound != fact:
+                    return False
+            elif term != fact.term or arity != len(fact.children):
+                return False
+            elif arity:
+                stack.extend(reversed(fact.children))
+        return True
+
     ### PROCESS AND ANSWER RULE QUERIES:
 
     def _derive_facts(self, pred, query):
@@ -284,9 +367,9 @@ class Database(object):
         pred = literal.predicate
         if self._needs_processing(pred, rules):
             facts = self._process_rule(pred, facts, rules)
-        table = self.facts.get(pred, []) + \
-                self.derived_facts.get(pred, []) + \
-                facts.get(pred, [])
+        tables = [table for table in (self.facts.get(pred), self.derived_facts.get(pred),
+                facts.get(pred)) if table]
+        table = tables[0] if len(tables) == 1 else [x for table in tables for x in table]
         for var_dict in variables:
             yield self._find_facts(table, literal.children, var_dict), var_dict
 
@@ -354,13 +437,14 @@ class Database(object):
         '''See define_fact() raise conditions.'''
         if type(args) is not list:
             raise TypeError('fact arguments should be a list')
-        for arg in args:
+        stack = list(reversed(args))
+        while stack:
+            arg = stack.pop()
             if arg.is_variable():
                 raise DatalogError(GDLError.FACT_VARIABLE, arg.token)
             if arg.is_not() or arg.is_distinct() or arg.is_or():
                 raise DatalogError(GDLError.FACT_RESERVED % arg.term, arg.token)
-            if arg.arity > 0:
-                self._sanity_check_fact_arguments(arg.children)
+            stack.extend(reversed(arg.children))
 
     ### RULE VALIDATION:
 
@@ -386,23 +470,25 @@ class Database(object):
                 raise DatalogError(GDLError.NEGATIVE_VARIABLE % token.value, token)
 
     def _collect_positive_variables(self, node):
-        if node.is_variable():
-            return [node.term]
-        if node.is_not() or node.is_distinct():
-            return []
         pos_vars = []
-        for child in node.children:
-            pos_vars.extend(self._collect_positive_variables(child))
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.is_variable():
+                pos_vars.append(node.term)
+            elif not node.is_not() and not node.is_distinct():
+                stack.extend(reversed(node.children))
         return pos_vars
 
     def _collect_negative_variables(self, node):
-        if node.is_variable():
-            return [node.token]
-        if not node.is_not() and not node.is_distinct():
-            return []
         neg_vars = []
-        for child in node.children:
-            neg_vars.extend(self._collect_negative_variables(child))
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.is_variable():
+                neg_vars.append(node.token)
+            elif node.is_not() or node.is_distinct():
+                stack.extend(reversed(node.children))
         return neg_vars
 
     def _check_negative_cycles(self, term, arity, body):
@@ -441,8 +527,26 @@ class Database(object):
         return False
 
     def _check_reserved_rule_arguments(self, args):
-        for arg in args:
+        stack = list(reversed(args))
+        while stack:
+            arg = stack.pop()
             if arg.is_not() or arg.is_distinct() or arg.is_or():
                 raise DatalogError(GDLError.RULE_HEAD_RESERVED % arg.term, arg.token)
-            if arg.arity > 0:
-                self._check_reserved_rule_arguments(arg.children)
+            stack.extend(reversed(arg.children))
+
+
+def _flatten(args):
+    '''Return a list of query arguments as a flat preorder list of (term,
+    arity, is_variable) entries, one per node, so that matching it against
+    a fact is a single scan instead of a walk over two trees.
+    '''
+    ret = []
+    stack = list(reversed(args))
+    while stack:
+        node = stack.pop()
+        if node.is_variable():
+            ret.append((node.term, 0, True))
+        else:
+            ret.append((node.term, len(node.children), False))
+            stack.extend(reversed(node.children))
+    return ret
@@ -15,10 +15,17 @@ class GDLError(Exception):
     RULE_HEAD_RESERVED = "Reserved keyword '%s' is not allowed in the head of a rule."
 
     def __init__(self, message, token):
-        errmsg = message + os.linesep + self._errmsg(token)
+        self.message = message
+        self.token = token
+        errmsg = message
+        if token.lineno is not None:
+            errmsg += os.linesep + self._errmsg(token)
         super(GDLError, self).__init__(errmsg)
 
     def _errmsg(self, token):
+        '''Point at the token in its line.  The line is only read back from
+        the token's source here.
+        '''
         lineno = '%d: ' % token.lineno
         nspaces = len(lineno) + token.column - 1
         err = lineno + token.line.rstrip() + os.linesep + (' ' * nspaces) + '^'
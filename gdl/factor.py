@@ -0,0 +1,209 @@
+from gdl.database import Database
+from gdl.state_machine import Game
+
+
+# nodes of the dependency graph which stand for every fluent or every move,
+# used where 'true' or 'does' is applied to a variable
+_ANY_FLUENT = ('fluent', None)
+_ANY_MOVE = ('move', None)
+
+_DYNAMIC = set([('init', 1), ('true', 1), ('next', 1), ('does', 2), ('legal', 2),
+        ('goal', 2), ('terminal', 0)])
+
+
+class Factor(object):
+    def __init__(self, game, fluents, moves):
+        '''An independent subgame.
+
+        Attributes:
+        game -- the compiled Game of the subgame
+        fluents -- the predicates of the state propositions it owns
+        moves -- the predicates of the moves it owns
+        '''
+        self.game = game
+        self.fluents = fluents
+        self.moves = moves
+
+    def owns(self, node):
+        '''Return whether or not a proposition or move belongs to this
+        factor alone.
+        '''
+        return node.predicate in self.fluents or node.predicate in self.moves
+
+    def __repr__(self):
+        return '<Factor %s>' % ' '.join('%s/%d' % x for x in sorted(self.fluents))
+
+
+class FactoredGame(object):
+    def __init__(self, game):
+        '''Split a compiled Game into independent subgames.
+
+        Fluents (the functors of 'true' and 'next' propositions) and moves
+        (the functors of 'legal' and 'does' moves) depend on each other
+        through the rules.  Every connected group which holds both fluents
+        and moves is a factor.  Fluents and moves which are connected to no
+        moves or no fluents, like a step counter or a 'noop' move, and
+        static relations are shared by every factor.  Goal and terminal
+        rules are kept in a factor if they only depend on it; the others
+        can only be evaluated on the whole game, see join().
+
+        Attributes:
+        game -- the Game which was factored
+        factors -- a list of Factor objects; a game which cannot be
+            factored has a single factor, an unchanged copy of the rules
+        shared -- the fluent and move predicates shared by every factor
+        '''
+        self.game = game
+        self.db = game.db
+        self._parent = {}
+        self._static = set(game.static_predicates())
+        self._connect()
+        self.factors, self.shared = self._build_factors()
+
+    ## PUBLIC API
+
+    def is_factored(self):
+        '''Return whether or not the game has more than one factor.'''
+        return len(self.factors) > 1
+
+    def split(self, machine):
+        '''Return a StateMachine for every factor, in the part of the state of
+        machine, a StateMachine of the whole game, which the factor owns or
+        shares.
+        '''
+        nodes = machine.propositions.decode(machine.state())
+        ret = []
+        for factor in self.factors:
+            fsm = factor.game.new_match()
+            table = fsm.propositions
+            keep = [n for n in nodes if factor.owns(n) or n.predicate in self.shared]
+            ret.append(fsm.restore(table.encode(keep)))
+        return ret
+
+    def join(self, machines):
+        '''Return a StateMachine of the whole game whose state is the union
+        of the states of the factor StateMachines, in the order of factors.
+        '''
+        nodes = []
+        for fsm in machines:
+            nodes.extend(fsm.propositions.decode(fsm.state()))
+        fsm = self.game.new_match()
+        return fsm.restore(self.game.propositions.encode(nodes))
+
+    ## HELPERS
+
+    def _find(self, node):
+        parent = self._parent.setdefault(node, node)
+        if parent != node:
+            parent = self._parent[node] = self._find(parent)
+        return parent
+
+    def _union(self, a, b):
+        self._parent[self._find(a)] = self._find(b)
+
+    def _is_static(self, pred):
+        return pred in self._static or (pred not in self.db.rules and pred not in _DYNAMIC)
+
+    def _head_node(self, pred, args):
+        if pred == ('next', 1):
+            return _fluent(args[0])
+        if pred == ('legal', 2):
+            return _move(args[1])
+        return ('view', pred)
+
+    def _body_nodes(self, literal):
+        '''Yield the graph nodes a body literal depends on.'''
+        if literal.is_not() or literal.is_or():
+            for child in literal.children:
+                for node in self._body_nodes(child):
+                    yield node
+        elif literal.is_distinct() or self._is_static(literal.predicate):
+            return
+        elif literal.predicate == ('true', 1):
+            yield _fluent(literal.children[0])
+        elif literal.predicate in (('does', 2), ('legal', 2)):
+            yield _move(literal.children[1])
+        else:
+            yield ('view', literal.predicate)
+
+    def _connect(self):
+        '''Join every rule head to the nodes its body depends on.  Goal and
+        terminal rules are left out, since they combine the factors.
+        '''
+        for pred, facts in self.db.facts.items():
+            if pred in (('init', 1), ('true', 1)):
+                for args in facts:
+                    self._find(_fluent(args[0]))
+            elif pred == ('legal', 2):
+                for args in facts:
+                    self._find(_move(args[1]))
+        for pred, rules in self.db.rules.items():
+            if pred in (('goal', 2), ('terminal', 0)) or self._is_static(pred):
+                continue
+            for args, body in rules:
+                head = self._find(self._head_node(pred, args))
+                for literal in body:
+                    for node in self._body_nodes(literal):
+                        self._union(head, node)
+        for kind, wildcard in (('fluent', _ANY_FLUENT), ('move', _ANY_MOVE)):
+            if wildcard in self._parent:
+                for node in list(self._parent):
+                    if node[0] == kind:
+                        self._union(node, wildcard)
+
+    def _build_factors(self):
+        groups = {}
+        for node in list(self._parent):
+            groups.setdefault(self._find(node), []).append(node)
+        owned, shared, shared_roots = [], set(), set()
+        for root, nodes in groups.items():
+            fluents = set(n[1] for n in nodes if n[0] == 'fluent' and n[1] is not None)
+            moves = set(n[1] for n in nodes if n[0] == 'move' and n[1] is not None)
+            if fluents and moves:
+                owned.append((root, fluents, moves))
+            else:
+                shared |= fluents | moves
+                shared_roots.add(root)
+        if len(owned) < 2:
+            return [Factor(self.game, set(), set())], shared
+        factors = []
+        for root, fluents, moves in owned:
+            game = self._subgame(shared_roots | set([root]))
+            factors.append(Factor(game, fluents, moves))
+        return factors, shared
+
+    def _subgame(self, roots):
+        '''Compile a Game from the static rules and the rules whose graph
+        nodes belong to one of roots.
+        '''
+        belongs = lambda node: self._find(node) in roots
+        db = Database()
+        for pred, facts in self.db.facts.items():
+            for args in facts:
+                if pred in (('init', 1), ('true', 1)):
+                    if not belongs(_fluent(args[0])):
+                        continue
+                elif pred == ('legal', 2):
+                    if not belongs(_move(args[1])):
+                        continue
+                db.define_fact(pred[0], pred[1], args)
+        for pred, rules in self.db.rules.items():
+            for args, body in rules:
+                if pred in (('goal', 2), ('terminal', 0)):
+                    nodes = [n for literal in body for n in self._body_nodes(literal)]
+                    if not all(belongs(n) for n in nodes):
+                        continue
+                elif not self._is_static(pred) and not belongs(self._head_node(pred, args)):
+                    continue
+                db.define_rule(pred[0], pred[1], args, body)
+        game = Game(db)
+        game.compile()
+        return game
+
+
+def _fluent(node):
+    return _ANY_FLUENT if node.is_variable() else ('fluent', node.predicate)
+
+
+def _move(node):
+    return _ANY_MOVE if node.is_variable() else ('move', node.predicate)
@@ -1,3 +1,4 @@
+import linecache
 import re
 
 
@@ -5,25 +6,49 @@ class NoInputError(Exception):
     pass
 
 
+class Source(object):
+    __slots__ = ('filename', 'lines')
+
+    def __init__(self, filename=None, lines=None):
+        '''Where tokens were read from.  The lines of a file are read back
+        from disk when they are needed; the lines of a string are kept.
+        '''
+        self.filename = filename
+        self.lines = lines
+
+    def line(self, lineno):
+        '''Return the text of a line, or '' if it cannot be read back.'''
+        if self.lines is not None:
+            return self.lines[lineno - 1]
+        return linecache.getline(self.filename, lineno) if self.filename else ''
+
+
 class Lexeme(object):
-    def __init__(self, filename, line, lineno, col=-1, value=''):
+    __slots__ = ('value', 'source', 'lineno', 'column')
+
+    def __init__(self, source, lineno, col=-1, value=''):
+        '''Create a token.  Tokens which were not read from any input, like
+        the tokens of derived facts, have no source and no position.
+        '''
         self.value = value
-        self.filename = filename
-        self.line = line
+        self.source = source
         self.lineno = lineno
         self.column = col
 
     @staticmethod
     def new(string):
-        token = Lexeme(None, None, None)
-        token.set(value=string)
-        return token
-
-    def set(self, filename=None, line=None, lineno=None, column=None, value=None):
-        if filename:
-            self.filename = filename
-        if line:
-            self.line = line
+        return Lexeme(None, None, value=string)
+
+    @property
+    def filename(self):
+        return self.source.filename if self.source is not None else None
+
+    @property
+    def line(self):
+        '''The text of the token's line, read back from its source.'''
+        return self.source.line(self.lineno) if self.source is not None else None
+
+    def set(self, lineno=None, column=None, value=None):
         if lineno:
             self.lineno = lineno
         if column:
@@ -65,32 +90,76 @@ class Lexeme(object):
         return self.value[0] not in ('?', '(', ')')
 
     def copy(self):
-        return Lexeme(self.filename, self.line, self.lineno, self.column, self.value)
+        '''Return a copy of the token without its position.'''
+        return Lexeme(None, None, value=self.value)
 
     def __repr__(self):
         return repr(self.value)
 
 
 class Lexer(object):
-    def __init__(self):
+    CHAR = 'char'
+    REGEX = 'regex'
+
+    # a parenthesis, a run of other non-whitespace characters, or a comment
+    TOKEN_RE = re.compile(r'[()]|[^\s();]+|;')
+
+    def __init__(self, scanner=REGEX):
+        '''Create a lexer.  The 'regex' scanner matches whole tokens with one
+        compiled regular expression; the 'char' scanner walks the input one
+        character at a time.  Both produce the same tokens and positions.
+        '''
+        if scanner not in (self.CHAR, self.REGEX):
+            raise ValueError('unknown scanner: %r' % scanner)
+        self.scanner = scanner
         self.values = []
         self.wsre = re.compile(r'\s')
 
     @staticmethod
-    def run_lex(**kwargs):
-        return Lexer().lex(**kwargs)
+    def run_lex(scanner=REGEX, **kwargs):
+        return Lexer(scanner).lex(**kwargs)
 
     def lex(self, data=None, file=None):
+        self._open(data, file)
+        if self.scanner == self.REGEX:
+            self.values.extend(self._scan_lines())
+            return self.values
+        return self._lex_input()
+
+    def iter_lex(self, data=None, file=None):
+        '''Like lex(), but return an iterator which yields the tokens as the
+        input is read, so a file is never held in memory as a whole.  The
+        'char' scanner still reads all of the input first.
+        '''
+        if self.scanner == self.CHAR:
+            return iter(self.lex(data, file))
+        self._open(data, file)
+        return self._scan_lines()
+
+    def _open(self, data, file):
         if file is None:
             if data is None:
                 raise NoInputError('no input to valueize')
             self.lines = data.splitlines(True)
-            self.filename = None
+            self.source = Source(lines=self.lines)
         else:
             self.lines = file
-            self.filename = file.name
-
-        return self._lex_input()
+            self.source = Source(filename=file.name)
+
+    def _scan_lines(self):
+        '''Tokenize the input a line at a time with TOKEN_RE.  Unlike the
+        character scanner, no placeholder tokens are made for whitespace.
+        '''
+        source = self.source
+        finditer = self.TOKEN_RE.finditer
+        row = 0
+        for line in self.lines:
+            row += 1
+            for match in finditer(line):
+                value = match.group()
+                if value == ';':
+                    break
+                yield Lexeme(source, row, match.start() + 1, value.lower())
 
     def _lex_input(self):
         row = 0
@@ -108,25 +177,25 @@ class Lexer(object):
             col += 1
             if char == ';':
                 break
-            self._process_char(char.lower(), line, row, col)
+            self._process_char(char.lower(), row, col)
 
-    def _process_char(self, char, line, row, col):
+    def _process_char(self, char, row, col):
         last_value = self.values[-1] if self.values else None
         if self._is_whitespace(char):
             if last_value is None or not last_value.is_empty():
-                self.values.append(Lexeme(self.filename, line, row))
+                self.values.append(Lexeme(self.source, row))
         elif char == '(' or char == ')':
             if last_value is not None and last_value.is_empty():
-                last_value.set(value=char, line=line, lineno=row, column=col)
+                last_value.set(value=char, lineno=row, column=col)
             else:
-                self.values.append(Lexeme(self.filename, line, row, col, char))
-            self.values.append(Lexeme(self.filename, line, row))
+                self.values.append(Lexeme(self.source, row, col, char))
+            self.values.append(Lexeme(self.source, row))
         else:
             if last_value is None:
-                last_value = Lexeme(self.filename, line, row, col)
+                last_value = Lexeme(self.source, row, col)
                 self.values.append(last_value)
             if last_value.is_empty():
-                last_value.set(line=line, lineno=row, column=col)
+                last_value.set(lineno=row, column=col)
             last_value.value += char
 
     def _is_whitespace(self, char):
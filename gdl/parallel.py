@@ -0,0 +1,219 @@
+import multiprocessing
+import os
+import random
+import time
+from gdl.ast import ASTNode
+from gdl.lexer import Lexeme, Lexer, Source
+from gdl.parser import ParseError, Parser
+from gdl.state_machine import PlayoutReport
+
+
+# the game loaded into each worker process by _init_worker()
+_machine = None
+# makes every worker take exactly one _sync_terms() task
+_barrier = None
+# seconds a worker waits for the others to sync their proposition tables
+_SYNC_TIMEOUT = 60
+
+
+def _init_worker(machine, barrier):
+    global _machine, _barrier
+    _machine = machine
+    _barrier = barrier
+
+
+def _sync_terms(task):
+    '''Intern the propositions the parent added to its table, in order, so
+    this worker's proposition ids stay in step with the parent's.
+
+    start is the size of the parent's table before new_terms were added.
+    Every worker runs one of these tasks and waits at the barrier until all
+    of them have, so no worker can take two.
+    '''
+    start, new_terms = task
+    table = _machine.propositions
+    for text in new_terms[len(table) - start:]:
+        table.intern(Parser.run_parse(Lexer.run_lex(data=text))[0])
+    _barrier.wait(_SYNC_TIMEOUT)
+
+
+def _run_batch(task):
+    index, data, count, seed = task
+    fsm = _machine.restore(_machine.propositions.from_bytes(data))
+    return index, fsm.run_playouts(count, random.Random(seed))
+
+
+def _encode(node):
+    '''Encode a parsed tree as a flat preorder list of (value, lineno,
+    column, arity) tuples, which pickles without recursion at any depth.
+    '''
+    ret = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        token = node.token
+        ret.append((token.value, token.lineno, token.column, len(node.children)))
+        stack.extend(reversed(node.children))
+    return ret
+
+
+def _decode(data, source):
+    '''Rebuild a tree encoded by _encode().  Walking the list backwards, the
+    children of every node have been built by the time it is reached.
+    '''
+    nodes = []
+    for value, lineno, column, arity in reversed(data):
+        node = ASTNode(Lexeme(source, lineno, column, value))
+        if arity:
+            node.children = nodes[:-arity - 1:-1]
+            del nodes[-arity:]
+        nodes.append(node)
+    return nodes[0]
+
+
+def _parse_file(filename):
+    '''Lex and parse a file.  Return the encoded sentences and None, or None
+    and the message and token position of a ParseError.
+    '''
+    try:
+        with open(filename, 'r') as file:
+            tokens = Lexer().iter_lex(file=file)
+            return [_encode(tree) for tree in Parser().iter_parse(tokens)], None
+    except ParseError as err:
+        token = err.token
+        return None, (err.message, token.value, token.lineno, token.column)
+
+
+def iter_parse_files(filenames, processes=None, method=None):
+    '''Lex and parse many GDL files in a pool of worker processes.  Yield
+    the sentences of the files in order, each file's as soon as it has been
+    parsed and the files before it have been yielded.
+
+    The workers send back compact encodings of the trees.  Every token keeps
+    its line and column and is tied to the file it came from, so errors
+    raised when the sentences are defined point into the right file.  With a
+    single process no pool is started and every file is streamed straight
+    from the lexer through the parser.
+
+    Raise ParseError for the first file, in order, with a syntax error.
+    '''
+    filenames = list(filenames)
+    processes = min(processes or os.cpu_count() or 1, len(filenames))
+    if processes <= 1:
+        for filename in filenames:
+            with open(filename, 'r') as file:
+                for tree in Parser().iter_parse(Lexer().iter_lex(file=file)):
+                    yield tree
+        return
+    if method is None and 'fork' in multiprocessing.get_all_start_methods():
+        method = 'fork'
+    with multiprocessing.get_context(method).Pool(processes) as pool:
+        for filename, (sentences, error) in zip(filenames, pool.imap(_parse_file, filenames)):
+            source = Source(filename=filename)
+            if error is not None:
+                message, value, lineno, column = error
+                raise ParseError(message, Lexeme(source, lineno, column, value))
+            for data in sentences:
+                yield _decode(data, source)
+
+
+def parse_files(filenames, processes=None, method=None):
+    '''Return the sentences of all of the files parsed by
+    iter_parse_files(), in order.
+    '''
+    return list(iter_parse_files(filenames, processes, method))
+
+
+def load_files(database, filenames, processes=None, method=None):
+    '''Parse GDL files with iter_parse_files() and define their sentences
+    in database as they arrive, so the sentences of all of the files are
+    never held in memory at once.
+    '''
+    for tree in iter_parse_files(filenames, processes, method):
+        database.define(tree)
+
+
+class PlayoutPool(object):
+    def __init__(self, machine, processes=None, method=None):
+        '''Start a pool of worker processes which each hold the game of the
+        given state machine.
+
+        With the 'fork' start method (the default where it is available) the
+        workers share the parsed rules copy-on-write.  Otherwise the machine
+        is pickled and rehydrated once per worker.  States are sent to the
+        workers as State bytes, so every machine handed to the pool must come
+        from the same game as machine.
+        '''
+        if method is None and 'fork' in multiprocessing.get_all_start_methods():
+            method = 'fork'
+        machine.state()
+        self.propositions = machine.propositions
+        self.synced = len(self.propositions)
+        self.processes = processes or os.cpu_count() or 1
+        context = multiprocessing.get_context(method)
+        self.pool = context.Pool(self.processes, _init_worker,
+                (machine, context.Barrier(self.processes)))
+
+    ## PUBLIC API
+
+    def imap_playouts(self, machine, count, seed=None, batch=None):
+        '''Run count random playouts from the state of machine across the
+        workers.  Yield a PlayoutReport for each batch of playouts as soon
+        as it finishes.
+        '''
+        for _, report in self._imap([machine], count, seed, batch):
+            yield report
+
+    def run_playouts(self, machine, count, seed=None, batch=None):
+        '''Run count random playouts in parallel and return a single
+        PlayoutReport.  The elapsed time is the wall-clock time of the whole
+        run, so playouts_per_sec reflects the combined throughput.
+        '''
+        return self.evaluate([machine], count, seed, batch)[0]
+
+    def evaluate(self, machines, count, seed=None, batch=None):
+        '''Run count random playouts from each of the given states, e.g. the
+        children of a search node.  Return a list of PlayoutReports in the
+        same order as machines.
+        '''
+        reports = [PlayoutReport() for _ in machines]
+        start = time.perf_counter()
+        for index, report in self._imap(machines, count, seed, batch):
+            reports[index].merge(report)
+        elapsed = time.perf_counter() - start
+        for report in reports:
+            report.elapsed = elapsed
+        return reports
+
+    def close(self):
+        '''Stop the worker processes.'''
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    ## HELPERS
+
+    def _imap(self, machines, count, seed, batch):
+        '''Split the playouts for every machine into batches and stream the
+        (index, PlayoutReport) results back in completion order.  The
+        propositions interned since the last call are sent to every worker
+        once, before the batches.
+        '''
+        rng = random.Random(seed)
+        batch = batch or max(1, count // (self.processes * 4))
+        states = [machine.state().to_bytes() for machine in machines]
+        new_terms = self.propositions.texts[self.synced:]
+        if new_terms:
+            self.pool.map(_sync_terms, [(self.synced, new_terms)] * self.processes, 1)
+            self.synced += len(new_terms)
+        tasks = []
+        for index, data in enumerate(states):
+            for start in range(0, count, batch):
+                size = min(batch, count - start)
+                tasks.append((index, data, size, rng.getrandbits(64)))
+        return self.pool.imap_unordered(_run_batch, tasks)
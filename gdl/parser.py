@@ -31,9 +31,18 @@ class Parser(object):
         return Parser().parse(tokens)
 
     def parse(self, tokens):
+        self.head.children = list(self.iter_parse(tokens))
+        return self.head.children
+
+    def iter_parse(self, tokens):
+        '''Like parse(), but yield every top-level sentence as soon as its
+        parentheses close.  tokens may be any iterable, such as the iterator
+        returned by Lexer.iter_lex().
+        '''
         new_sentence = False
-        curr = self.head
+        head = curr = ASTNode()
         parents = []
+        token = None
         for token in tokens:
             if new_sentence:
                 if not token.is_constant():
@@ -54,9 +63,10 @@ class Parser(object):
                 curr = popped
             else:
                 curr.create_child(token)
+            if not parents and head.children:
+                yield head.children.pop()
         if parents:
-            raise ParseError(GDLError.MISSING_CLOSE, tokens[-1])
-        return self.head.children
+            raise ParseError(GDLError.MISSING_CLOSE, token)
 
     def _validate_node(self, node):
         if self.RESERVED.get(node.term, node.arity) != node.arity:
@@ -0,0 +1,254 @@
+import asyncio
+import concurrent.futures
+import re
+import threading
+import time
+from gdl.search import MCTS
+from gdl.state_machine import Game
+
+
+_TOKEN = re.compile(r'[()]|[^\s()]+')
+
+
+def read_sexp(text):
+    '''Read the s-expressions of a GGP message into nested lists of strings.
+
+    Raise ValueError if the parentheses are unbalanced.
+    '''
+    stack = [[]]
+    for token in _TOKEN.findall(text.lower()):
+        if token == '(':
+            stack.append([])
+        elif token == ')':
+            if len(stack) == 1:
+                raise ValueError('unexpected closed parenthesis')
+            expr = stack.pop()
+            stack[-1].append(expr)
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1:
+        raise ValueError('missing closed parenthesis')
+    return stack[0]
+
+
+def write_sexp(expr):
+    '''Write nested lists of strings back out as KIF.'''
+    if isinstance(expr, list):
+        return '(' + ' '.join(write_sexp(x) for x in expr) + ')'
+    return expr
+
+
+class Match(object):
+    def __init__(self, id, role, machine, search, playclock):
+        '''The state of one match that the player is taking part in.'''
+        self.id = id
+        self.role = role
+        self.machine = machine
+        self.search = search
+        self.playclock = playclock
+        # the machine the search was last advanced to
+        self.searched = machine
+        # the future and stop event of a search which overran its clock
+        self.pending = None
+        self.stop = None
+
+
+class Player(object):
+    def __init__(self, name='pygdl', margin=1.0, workers=None, search=MCTS, cache=None):
+        '''Create a GGP player which can take part in many matches at once.
+
+        Arguments:
+        name -- the name reported to the game manager
+        margin -- seconds of every clock kept back for communication
+        workers -- the number of searches which may run at the same time
+        search -- a search class like gdl.search.MCTS or AlphaBeta
+        cache -- a gdl.cache.GameCache to load compiled games from
+        '''
+        self.name = name
+        self.margin = margin
+        self.search_class = search
+        self.cache = cache
+        self.matches = {}
+        self.games = {}
+        # matches whose game was still compiling when the start clock ran out
+        self.starting = {}
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers or 4)
+        # loads games and applies moves, so that this never waits behind
+        # the searches or runs on the event loop
+        self.updater = concurrent.futures.ThreadPoolExecutor(workers or 4)
+
+    ## PUBLIC API
+
+    async def serve(self, host='127.0.0.1', port=9147):
+        '''Start listening for HTTP requests from game managers.  Return the
+        asyncio server.
+        '''
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def handle(self, message):
+        '''Answer one GGP message and return the response text.
+
+        Raise ValueError for messages which are not understood and KeyError
+        for unknown match ids.
+        '''
+        exprs = read_sexp(message)
+        if len(exprs) != 1 or not isinstance(exprs[0], list) or not exprs[0]:
+            raise ValueError('not a GGP message: %r' % message)
+        command, args = exprs[0][0], exprs[0][1:]
+        if command == 'info':
+            return '((name %s) (status available))' % self.name
+        elif command == 'start':
+            return await self._start(*args)
+        elif command == 'play':
+            return await self._play(*args)
+        elif command == 'stop':
+            await self._play(*args, finished=True)
+            return 'done'
+        elif command == 'abort':
+            self.starting.pop(args[0], None)
+            match = self.matches.pop(args[0], None)
+            if match is not None and match.stop is not None:
+                match.stop.set()
+            return 'done'
+        raise ValueError('unknown GGP message: %r' % command)
+
+    def close(self):
+        '''Stop the search and update threads.'''
+        self.executor.shutdown(wait=False)
+        self.updater.shutdown(wait=False)
+
+    ## HELPERS
+
+    async def _start(self, id, role, description, startclock, playclock):
+        '''Load the game and spend the rest of the start clock searching.
+        Compiling the game derives its static relations up front.  If that
+        takes longer than the start clock, reply anyway and let the first
+        play message wait for it.
+        '''
+        deadline = time.perf_counter() + float(startclock) - self.margin
+        loop = asyncio.get_running_loop()
+        data = ' '.join(write_sexp(x) for x in description)
+        future = loop.run_in_executor(self.updater, self._new_match,
+                id, role, data, float(playclock))
+        try:
+            match = await asyncio.wait_for(asyncio.shield(future),
+                    max(deadline - time.perf_counter(), 0))
+        except asyncio.TimeoutError:
+            self.starting[id] = future
+            return 'ready'
+        self.matches[id] = match
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            await self._search(match, remaining)
+        return 'ready'
+
+    def _new_match(self, id, role, data, playclock):
+        '''Start a match, compiling the game unless another match of the same
+        game description has already done so.
+        '''
+        game = self.games.get(data)
+        if game is None:
+            game = self.cache.game(data) if self.cache is not None else Game(data=data)
+            self.games[data] = game
+        machine = game.new_match()
+        if role not in machine.players:
+            raise ValueError('no such role: %r' % role)
+        return Match(id, role, machine, self.search_class(machine, role), playclock)
+
+    async def _play(self, id, moves, finished=False):
+        '''Update the match with the last joint move and choose our move
+        before the play clock runs out.
+        '''
+        received = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        if id in self.starting:
+            self.matches[id] = await self.starting.pop(id)
+        match = self.matches[id]
+        deadline = received + match.playclock - self.margin
+        if finished:
+            if match.stop is not None:
+                match.stop.set()
+            del self.matches[id]
+            return None
+        if moves != 'nil':
+            match.machine = await loop.run_in_executor(self.updater, self._update,
+                    match.machine, moves)
+        move = None
+        if match.pending is not None:
+            # the last search overran; ask it to stop and give it what is
+            # left of the clock
+            match.stop.set()
+            await asyncio.wait([match.pending], timeout=max(deadline - time.perf_counter(), 0))
+            if match.pending.done():
+                match.pending = match.stop = None
+        if match.pending is None:
+            move = await self._search(match, deadline - time.perf_counter())
+        if move is None:
+            move = await loop.run_in_executor(self.updater, self._first_legal_move, match)
+        return str(move)
+
+    def _update(self, machine, moves):
+        '''Return the state machine after the joint move of a play message.'''
+        for role, move in zip(machine.roles, moves):
+            machine.move(role, write_sexp(move))
+        return machine.next()
+
+    def _first_legal_move(self, match):
+        '''Return our first legal move, for when no search finished in time.'''
+        return match.machine.legal_moves(match.role)[0]
+
+    async def _search(self, match, seconds):
+        '''Run the match's search in the executor for at most seconds.
+
+        If the search overruns the clock, or is still queued behind other
+        matches, tell it to stop, return None and keep it as the match's
+        pending search.
+        '''
+        loop = asyncio.get_running_loop()
+        seconds = max(seconds, 0.0)
+        stop = threading.Event()
+        future = loop.run_in_executor(self.executor, self._think, match, match.machine,
+                seconds, stop)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), seconds + self.margin / 2)
+        except asyncio.TimeoutError:
+            stop.set()
+            match.pending, match.stop = future, stop
+            return None
+
+    def _think(self, match, machine, seconds, stop):
+        '''Advance the match's search to machine and search for at most
+        seconds.  Runs in the executor, so the transposition lookups and
+        queries of advance() do not hold up the other matches.
+        '''
+        if match.searched is not machine:
+            match.search.advance(machine)
+            match.searched = machine
+        return match.search.search(seconds, stop=stop)
+
+    async def _handle_connection(self, reader, writer):
+        '''Answer one HTTP POST request from a game manager.'''
+        try:
+            await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            body = (await reader.readexactly(length)).decode('utf-8')
+            try:
+                response, status = await self.handle(body), '200 OK'
+            except Exception as err:
+                response, status = 'error: %s' % err, '400 Bad Request'
+            data = response.encode('utf-8')
+            head = 'HTTP/1.0 %s\r\n' \
+                   'Content-Type: text/acl\r\n' \
+                   'Content-Length: %d\r\n' \
+                   'Access-Control-Allow-Origin: *\r\n\r\n' % (status, len(data))
+            writer.write(head.encode('ascii') + data)
+            await writer.drain()
+        finally:
+            writer.close()
@@ -0,0 +1,3 @@
+from gdl.search.alphabeta import AlphaBeta
+from gdl.search.mcts import MCTS
+from gdl.search.stats import SearchStats
@@ -0,0 +1,194 @@
+import itertools
+import sys
+import time
+from gdl.search.stats import SearchStats, sizeof
+from gdl.transposition import TranspositionTable
+
+
+# the depth recorded for values whose subtree was searched to the end
+COMPLETE = sys.maxsize
+
+
+class _Timeout(Exception):
+    pass
+
+
+def goal_heuristic(machine, role):
+    '''Evaluate a non-terminal state by role's goal value, or 50 if no goal
+    is defined for it.
+    '''
+    score = machine.score(role)
+    return 50 if score is None else score
+
+
+class AlphaBeta(object):
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    def __init__(self, machine, role, heuristic=goal_heuristic, transpositions=None,
+            analysis=None, symmetries=None):
+        '''Create an iterative-deepening alpha-beta search for role from the
+        state of machine.
+
+        Other players are assumed to choose their joint move knowing role's
+        move and to minimize role's score (a paranoid search), which makes
+        simultaneous-move and multi-player games searchable.  States at the
+        depth limit are scored with heuristic(machine, role).  If a
+        GameAnalysis is given, lines of play whose goals are already decided
+        are cut off.  If a gdl.symmetry.Symmetries is given, every state is
+        searched in its canonical form, so symmetric positions share their
+        transposition table entries.
+        '''
+        self.role = role
+        self.analysis = analysis
+        self.symmetries = symmetries
+        self.players = sorted(machine.players)
+        self.heuristic = heuristic
+        self.transpositions = TranspositionTable(policy=TranspositionTable.DEPTH) \
+                if transpositions is None else transpositions
+        self.stats = SearchStats()
+        self.machine, self.symmetry = self._working_copy(machine)
+        self.depth = 0
+        self.value = None
+        self.deadline = None
+        self.stop = None
+
+    ## PUBLIC API
+
+    def search(self, seconds=None, depth=None, stop=None):
+        '''Search one ply deeper at a time until the time budget in seconds
+        runs out, depth is reached, the whole game tree has been searched, or
+        stop, a threading.Event, is set.  Return the best move for role from
+        the deepest finished iteration, or None if the state is terminal.
+
+        Raise ValueError if neither limit is given.
+        '''
+        if seconds is None and depth is None:
+            raise ValueError('a time budget or depth limit is required')
+        start = time.perf_counter()
+        self.deadline = start + seconds if seconds is not None else None
+        self.stop = stop
+        best = None
+        current = 1
+        try:
+            while depth is None or current <= depth:
+                value, move, complete = self._max(current, -1, 101)
+                best, self.value, self.depth = move, value, current
+                if complete:
+                    break
+                current += 1
+        except _Timeout:
+            pass
+        finally:
+            self.deadline = self.stop = None
+            self.stats.elapsed += time.perf_counter() - start
+            self._measure()
+        if best is not None and self.symmetry is not None:
+            best = self.symmetry.inverse.map_move(best, self.machine.propositions)
+        return best
+
+    def advance(self, machine):
+        '''Continue from the state of machine.  The transposition table, and
+        with it the work of previous turns, is kept.
+        '''
+        self.machine, self.symmetry = self._working_copy(machine)
+
+    ## HELPERS
+
+    def _working_copy(self, machine):
+        '''Return a copy of machine to search with, in its canonical state if
+        symmetries are used, and the Symmetry which maps machine onto it.
+        '''
+        fsm = machine.restore(machine.state())
+        if self.symmetries is None:
+            return fsm, None
+        return fsm, fsm.canonicalize(self.symmetries)
+
+    def _max(self, depth, alpha, beta, ply=0):
+        '''Return the value of the current state for role, the best move, and
+        whether or not the search reached the end of every line of play.
+
+        Values outside of (alpha, beta) are only bounds, as usual.
+        '''
+        self.stats.nodes += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise _Timeout()
+        if self.stop is not None and self.stop.is_set():
+            raise _Timeout()
+        fsm = self.machine
+        entry = self.transpositions.lookup(fsm, depth)
+        if entry.terminal:
+            return (entry.goals or {}).get(self.role, 0), None, True
+        if ply > 0 and self.analysis is not None:
+            goals = self.analysis.decided_goals(fsm)
+            if goals is not None:
+                return goals.get(self.role, 0), None, True
+        if depth == 0:
+            return self.heuristic(fsm, self.role), None, False
+
+        tt_move = None
+        if entry.value is not None:
+            tt_depth, value, flag, tt_move = entry.value
+            if tt_depth >= depth:
+                if flag == self.EXACT:
+                    return value, tt_move, tt_depth == COMPLETE
+                elif flag == self.LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, tt_move, tt_depth == COMPLETE
+
+        moves = list(entry.legal[self.role])
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        others = [name for name in self.players if name != self.role]
+        replies = list(itertools.product(*[entry.legal[name] for name in others]))
+        index = self.players.index(self.role)
+
+        orig_alpha = alpha
+        best_value, best_move, complete = None, None, True
+        for move in moves:
+            value = beta
+            for reply in replies:
+                joint = reply[:index] + (move,) + reply[index:]
+                successor = entry.successors.get(joint)
+                fsm.apply(joint, successor)
+                if successor is None:
+                    entry.successors[joint] = fsm.state()
+                try:
+                    if self.symmetries is not None:
+                        fsm.canonicalize(self.symmetries)
+                    child, _, child_complete = self._max(depth - 1, alpha, value, ply + 1)
+                finally:
+                    fsm.undo()
+                complete = complete and child_complete
+                value = min(value, child)
+                if value <= alpha:
+                    break
+            if best_value is None or value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, best_value)
+            if alpha >= beta:
+                break
+
+        if best_value <= orig_alpha:
+            flag = self.UPPER
+        elif best_value >= beta:
+            flag = self.LOWER
+        else:
+            flag = self.EXACT
+        stored_depth = COMPLETE if complete else depth
+        entry.value = (stored_depth, best_value, flag, best_move)
+        entry.depth = max(entry.depth, stored_depth)
+        return best_value, best_move, complete
+
+    def _measure(self):
+        '''Update the tree size and memory statistics.'''
+        tt = self.transpositions
+        entries = tt.entries.values() if tt.policy == tt.LRU else \
+                [entry for entry in tt.slots if entry is not None]
+        self.stats.tree_size = len(tt)
+        self.stats.memory = sum(sizeof(entry) for entry in entries)
@@ -0,0 +1,198 @@
+import math
+import random
+import time
+from gdl.search.stats import SearchStats, sizeof
+from gdl.state_machine import GameError
+from gdl.transposition import TranspositionTable
+
+
+class Node(object):
+    __slots__ = ('state', 'terminal', 'decided', 'goals', 'stats', 'children', 'visits')
+
+    def __init__(self, entry, players):
+        '''Create a search tree node from a transposition table Entry.
+
+        For every player, stats maps each legal Move to a list of
+        [visits, total score].
+        '''
+        self.state = entry.state
+        self.terminal = entry.terminal
+        self.decided = False
+        self.goals = entry.goals or {}
+        self.stats = {}
+        self.children = {}
+        self.visits = 0
+        if not self.terminal:
+            for name in players:
+                if name not in entry.legal:
+                    raise GameError(GameError.NO_LEGAL_MOVES % name)
+                self.stats[name] = dict((move, [0, 0]) for move in entry.legal[name])
+
+
+class MCTS(object):
+    def __init__(self, machine, role, exploration=1.4, rng=None, transpositions=None,
+            analysis=None, symmetries=None):
+        '''Create a UCT search for role from the state of machine.
+
+        Simultaneous moves are handled by keeping separate move statistics
+        for every player at each node (decoupled UCT).  Scores are
+        normalized to [0, 1] before the exploration term is added.  If a
+        GameAnalysis is given, states whose goals are already decided are
+        not searched any further.  If a gdl.symmetry.Symmetries is given, the
+        tree is built over canonical states, so symmetric positions share
+        their nodes and transposition table entries.
+        '''
+        self.role = role
+        self.players = sorted(machine.players)
+        self.exploration = exploration
+        self.rng = rng or random.Random()
+        self.transpositions = TranspositionTable() if transpositions is None else transpositions
+        self.analysis = analysis
+        self.symmetries = symmetries
+        self.stats = SearchStats()
+        self.machine, self.symmetry = self._working_copy(machine)
+        self.root = self._new_node(self.machine)
+
+    ## PUBLIC API
+
+    def search(self, seconds=None, iterations=None, stop=None):
+        '''Grow the tree until the time budget in seconds or the number of
+        iterations is used up, whichever comes first, or until stop, a
+        threading.Event, is set.  Return the best move for role, or None if
+        the root is terminal.
+
+        Raise ValueError if neither limit is given.
+        '''
+        if seconds is None and iterations is None:
+            raise ValueError('a time budget or iteration count is required')
+        start = time.perf_counter()
+        deadline = start + seconds if seconds is not None else None
+        count = 0
+        while not self.root.terminal:
+            if iterations is not None and count >= iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if stop is not None and stop.is_set():
+                break
+            self._iterate()
+            count += 1
+        self.stats.elapsed += time.perf_counter() - start
+        self._measure()
+        return self.best_move()
+
+    def best_move(self):
+        '''Return the most visited move for role at the root.'''
+        if self.root.terminal:
+            return None
+        stats = self.root.stats[self.role]
+        move = max(stats, key=lambda move: stats[move])
+        if self.symmetry is not None:
+            move = self.symmetry.inverse.map_move(move, self.machine.propositions)
+        return move
+
+    def advance(self, machine):
+        '''Move the root to the state of machine, e.g. after the turn has
+        been played.  The subtree below the new root is kept.
+        '''
+        self.machine, self.symmetry = self._working_copy(machine)
+        state = self.machine.state()
+        for child in self.root.children.values():
+            if child.state == state:
+                self.root = child
+                break
+        else:
+            self.root = self._new_node(self.machine)
+        self._measure()
+
+    ## HELPERS
+
+    def _working_copy(self, machine):
+        '''Return a copy of machine to search with, in its canonical state if
+        symmetries are used, and the Symmetry which maps machine onto it.
+        '''
+        fsm = machine.restore(machine.state())
+        if self.symmetries is None:
+            return fsm, None
+        return fsm, fsm.canonicalize(self.symmetries)
+
+    def _new_node(self, machine):
+        node = Node(self.transpositions.lookup(machine), self.players)
+        if not node.terminal and self.analysis is not None:
+            goals = self.analysis.decided_goals(machine)
+            if goals is not None:
+                node.decided, node.goals = True, goals
+        return node
+
+    def _iterate(self):
+        '''Select a path with UCT, expand one node, run a random playout
+        from it, and back the scores up the path.
+        '''
+        fsm = self.machine
+        node = self.root
+        path = []
+        try:
+            while not (node.terminal or node.decided):
+                joint = self._select(node)
+                path.append((node, joint))
+                child = node.children.get(joint)
+                if child is not None:
+                    # the child holds the (canonical) state the move leads to
+                    fsm.apply(joint, child.state)
+                    node = child
+                    continue
+                fsm.apply(joint)
+                if self.symmetries is not None:
+                    fsm.canonicalize(self.symmetries)
+                child = node.children[joint] = self._new_node(fsm)
+                node = child
+                break
+            if node.terminal or node.decided:
+                goals = node.goals
+            else:
+                goals = fsm.depth_charge(self.rng) or {}
+        finally:
+            for _ in path:
+                fsm.undo()
+
+        node.visits += 1
+        for parent, joint in path:
+            parent.visits += 1
+            for name, move in zip(self.players, joint):
+                stat = parent.stats[name][move]
+                stat[0] += 1
+                stat[1] += goals.get(name, 0)
+        self.stats.nodes += len(path) + 1
+
+    def _select(self, node):
+        '''Choose a move for every player with UCB1.  Untried moves are
+        chosen first, at random.
+        '''
+        joint = []
+        log_visits = math.log(node.visits) if node.visits else 0.0
+        for name in self.players:
+            stats = node.stats[name]
+            untried = [move for move in stats if stats[move][0] == 0]
+            if untried:
+                joint.append(self.rng.choice(untried))
+                continue
+            best, best_value = None, None
+            for move, (visits, total) in stats.items():
+                value = total / (100.0 * visits) + \
+                        self.exploration * math.sqrt(log_visits / visits)
+                if best_value is None or value > best_value:
+                    best, best_value = move, value
+            joint.append(best)
+        return tuple(joint)
+
+    def _measure(self):
+        '''Update the tree size and memory statistics.'''
+        size, memory = 0, 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            size += 1
+            memory += sizeof(node)
+            stack.extend(node.children.values())
+        self.stats.tree_size = size
+        self.stats.memory = memory
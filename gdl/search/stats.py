@@ -0,0 +1,41 @@
+import sys
+
+
+class SearchStats(object):
+    def __init__(self):
+        '''Collect statistics for a game-tree search.
+
+        Attributes:
+        nodes -- the number of nodes visited
+        elapsed -- the number of seconds spent searching
+        tree_size -- the number of nodes (or table entries) held
+        memory -- an estimate in bytes of the memory held by the tree
+        '''
+        self.nodes = 0
+        self.elapsed = 0.0
+        self.tree_size = 0
+        self.memory = 0
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return '<SearchStats %d nodes, %.1f nodes/sec, %d in tree, %d bytes>' % \
+                (self.nodes, self.nodes_per_sec, self.tree_size, self.memory)
+
+
+def sizeof(obj):
+    '''Estimate the memory held by an object with __slots__ along with the
+    containers it references directly.
+    '''
+    size = sys.getsizeof(obj)
+    for name in getattr(type(obj), '__slots__', ()):
+        value = getattr(obj, name, None)
+        if isinstance(value, (dict, list, tuple, set, frozenset)):
+            size += sys.getsizeof(value)
+            if isinstance(value, dict):
+                for item in value.values():
+                    if isinstance(item, (dict, list)):
+                        size += sys.getsizeof(item)
+    return size
@@ -0,0 +1,259 @@
+import array
+import bisect
+import mmap
+import pickle
+import struct
+import sys
+from gdl.ast import ASTNode
+from gdl.lexer import Lexer
+from gdl.parser import Parser
+
+
+MAGIC = b'GDLS'
+FORMAT = 1
+
+_HEADER = struct.Struct('<4sII')
+
+# every integer in a snapshot is a little-endian uint32; on other hosts the
+# arrays are decoded into memory instead of being read in place
+_IN_PLACE = sys.byteorder == 'little' and array.array('I').itemsize == 4
+
+
+def write_snapshot(path, database, predicates=None):
+    '''Write the facts of a Database to a snapshot file which Snapshot can
+    open in place.
+
+    Every distinct argument term is stored once in a sorted symbol table,
+    and every relation as a fixed-width array of symbol ids, one row per
+    fact, with one index per column listing the rows sorted by that
+    column's symbol.  predicates limits the relations written; by default
+    every fact predicate is.
+    '''
+    preds = sorted(predicates if predicates is not None else database.facts)
+    texts = sorted(set(str(arg) for pred in preds for args in database.facts[pred] \
+            for arg in args), key=lambda text: text.encode('utf-8'))
+    ids = dict((text, id) for id, text in enumerate(texts))
+
+    chunks = []
+    offset = [0]
+    def add(data):
+        start = offset[0]
+        chunks.append(data)
+        offset[0] += len(data)
+        return start
+
+    relations = {}
+    for pred in preds:
+        rows = [[ids[str(arg)] for arg in args] for args in database.facts[pred]]
+        arity = pred[1]
+        data = add(struct.pack('<%dI' % (len(rows) * arity), *[x for row in rows for x in row]))
+        indexes = []
+        for column in range(arity):
+            order = sorted(range(len(rows)), key=lambda row: (rows[row][column], row))
+            indexes.append(add(struct.pack('<%dI' % len(order), *order)))
+        relations[pred] = (len(rows), data, indexes)
+
+    blob = [text.encode('utf-8') for text in texts]
+    bounds = [0]
+    for text in blob:
+        bounds.append(bounds[-1] + len(text))
+    symbols = (len(texts), add(struct.pack('<%dI' % len(bounds), *bounds)), add(b''.join(blob)))
+
+    meta = pickle.dumps((symbols, relations), pickle.HIGHEST_PROTOCOL)
+    meta += b'\0' * (-(_HEADER.size + len(meta)) % 4)
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, FORMAT, len(meta)))
+        file.write(meta)
+        for chunk in chunks:
+            file.write(chunk)
+
+
+class Relation(object):
+    def __init__(self, snapshot, arity, rows, data, indexes):
+        '''A read-only list of the facts of one predicate, decoded from the
+        snapshot a row at a time.  Use Database.attach() to query it.
+        '''
+        self.snapshot = snapshot
+        self.arity = arity
+        self.rows = rows
+        self.data = data
+        self.indexes = indexes
+
+    def candidates(self, query_args, variables=None):
+        '''Return the facts which may match query_args, given the variable
+        bindings so far.  The index of the first ground or bound argument
+        narrows the rows down to those with the same symbol in that column.
+        Compound arguments which hold variables are not symbols, so they
+        cannot be looked up and are skipped.
+        '''
+        for column, query in enumerate(query_args):
+            if query.is_variable():
+                query = variables.get(query.term) if variables else None
+                if query is None:
+                    continue
+            elif not _is_ground(query):
+                continue
+            id = self.snapshot.symbol_id(str(query))
+            if id is None:
+                return []
+            index = self.indexes[column]
+            keys = _Column(index, self.data, self.arity, column)
+            lo = bisect.bisect_left(keys, id)
+            hi = bisect.bisect_right(keys, id, lo)
+            return [self[row] for row in index[lo:hi]]
+        return self
+
+    def append(self, args):
+        raise TypeError('snapshot relations are read-only')
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        if not 0 <= row < self.rows:
+            raise IndexError('relation index out of range')
+        node = self.snapshot.node
+        start = row * self.arity
+        return [node(id) for id in self.data[start:start + self.arity]]
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self[row]
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+
+class _Column(object):
+    '''The symbol ids of one column, in the order of one of its indexes, as
+    a sequence for bisect.
+    '''
+    def __init__(self, index, data, arity, column):
+        self.index = index
+        self.data = data
+        self.arity = arity
+        self.column = column
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        return self.data[self.index[i] * self.arity + self.column]
+
+
+class Snapshot(object):
+    def __init__(self, path):
+        '''Open a snapshot written by write_snapshot().  The file is mapped
+        into memory and read in place, so processes which open the same
+        snapshot share one copy of it in the page cache.  The file is always
+        little-endian; on a big-endian host its arrays are decoded into
+        memory instead.  Symbols are only
+        turned into ASTNodes when a fact which holds them is read.
+
+        Raise ValueError if the file is not a snapshot.
+
+        Attributes:
+        relations -- a dict mapping predicates to Relation objects
+        '''
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, format, size = _HEADER.unpack_from(self.map)
+        except struct.error:
+            magic = format = None
+        if magic != MAGIC or format != FORMAT:
+            self.map.close()
+            self.file.close()
+            raise ValueError('not a snapshot file: %r' % path)
+        start = _HEADER.size + size
+        symbols, relations = pickle.loads(self.map[_HEADER.size:start])
+        self._views = [memoryview(self.map)]
+        def ints(offset, count):
+            if not _IN_PLACE:
+                return array.array('I', struct.unpack_from('<%dI' % count, self.map,
+                        start + offset))
+            view = self._views[0][start + offset:start + offset + 4 * count].cast('I')
+            self._views.append(view)
+            return view
+        count, bounds, blob = symbols
+        self.count = count
+        self.bounds = ints(bounds, count + 1)
+        self.blob = start + blob
+        self.nodes = {}
+        self.relations = {}
+        for pred, (rows, data, indexes) in relations.items():
+            arity = pred[1]
+            self.relations[pred] = Relation(self, arity, rows, ints(data, rows * arity),
+                    [ints(index, rows) for index in indexes])
+
+    ## PUBLIC API
+
+    def symbol(self, id):
+        '''Return the text of a symbol.'''
+        return self._symbol_bytes(id).decode('utf-8')
+
+    def symbol_id(self, text):
+        '''Return the id of the symbol for text, or None.'''
+        key = text.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._symbol_bytes(mid)
+            if value < key:
+                lo = mid + 1
+            elif value > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def node(self, id):
+        '''Return the ASTNode of a symbol.  Nodes are cached and shared, so
+        they must not be modified.
+        '''
+        try:
+            return self.nodes[id]
+        except KeyError:
+            text = self.symbol(id)
+            if text.startswith('('):
+                node = Parser.run_parse(Lexer.run_lex(data=text))[0]
+            else:
+                node = ASTNode.new(text)
+            self.nodes[id] = node
+            return node
+
+    def close(self):
+        '''Unmap the file.  Relations of the snapshot must not be used
+        afterwards.
+        '''
+        self.relations = {}
+        self.nodes = {}
+        for view in reversed(self._views):
+            view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    ## HELPERS
+
+    def _symbol_bytes(self, id):
+        return self.map[self.blob + self.bounds[id]:self.blob + self.bounds[id + 1]]
+
+
+def _is_ground(node):
+    '''Return whether or not an ASTNode holds no variables.'''
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.is_variable():
+            return False
+        stack.extend(node.children)
+    return True
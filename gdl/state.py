@@ -0,0 +1,186 @@
+import hashlib
+import struct
+import threading
+
+
+def term_key(node):
+    '''Return a hashable key which identifies a ground ASTNode: its term, or
+    a flat tuple of the term and arity of every node in preorder, which can
+    be hashed and compared at any depth.
+    '''
+    if not node.children:
+        return node.term
+    ret = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        ret.append(node.term)
+        ret.append(len(node.children))
+        stack.extend(reversed(node.children))
+    return tuple(ret)
+
+
+def _zobrist_key(text):
+    '''Derive a pseudo-random 64-bit key from the text of a proposition.
+
+    The key depends only on the proposition itself, so hashes agree between
+    tables and between processes.
+    '''
+    return int.from_bytes(hashlib.md5(text.encode('utf-8')).digest()[:8], 'little')
+
+
+class State(object):
+    __slots__ = ('propositions', 'hash')
+
+    def __init__(self, propositions, hash):
+        '''Create a state from a frozenset of proposition ids and its
+        Zobrist hash.  Use PropositionTable.encode() to build one.
+        '''
+        self.propositions = propositions
+        self.hash = hash
+
+    def transition(self, ids, table):
+        '''Return the state holding the proposition ids.  The hash is updated
+        incrementally from the propositions which changed.
+        '''
+        propositions = frozenset(ids)
+        hash = self.hash
+        keys = table.keys
+        for id in self.propositions ^ propositions:
+            hash ^= keys[id]
+        return State(propositions, hash)
+
+    def to_bytes(self):
+        '''Serialize the state as a compact array of sorted proposition ids.'''
+        ids = sorted(self.propositions)
+        return struct.pack('<%dI' % len(ids), *ids)
+
+    def __len__(self):
+        return len(self.propositions)
+
+    def __iter__(self):
+        return iter(self.propositions)
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        return self.hash == other.hash and self.propositions == other.propositions
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<State %d propositions %016x>' % (len(self.propositions), self.hash)
+
+
+class Move(object):
+    __slots__ = ('node', 'id', 'text')
+
+    def __init__(self, node, id, text):
+        '''Create an interned move.  Use PropositionTable.move() to get one.'''
+        self.node = node
+        self.id = id
+        self.text = text
+
+    def __hash__(self):
+        return self.id
+
+    def __eq__(self, other):
+        return isinstance(other, Move) and self.id == other.id
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return self.text
+
+
+class PropositionTable(object):
+    def __init__(self):
+        '''Create a table which interns ground propositions as small integer
+        ids, each with a 64-bit Zobrist key.  Ids are handed out in order, so
+        two tables which intern the same propositions in the same order agree
+        on every id.  The text of every proposition is rendered once, when it
+        is interned, and kept in texts.
+
+        A table is shared by every match of a Game, so new propositions are
+        added under a lock; looking up one which is already there is not.
+        '''
+        self.ids = {}
+        self.terms = []
+        self.texts = []
+        self.keys = []
+        self.moves = {}
+        self._lock = threading.Lock()
+
+    def intern(self, node):
+        '''Return the id of a ground ASTNode, adding it to the table if it is
+        new.
+        '''
+        key = term_key(node)
+        try:
+            return self.ids[key]
+        except KeyError:
+            pass
+        with self._lock:
+            id = self.ids.get(key)
+            if id is None:
+                # publish the id last, so that a lookup which finds it
+                # without the lock also finds the term
+                id = len(self.terms)
+                text = str(node)
+                self.terms.append(node)
+                self.texts.append(text)
+                self.keys.append(_zobrist_key(text))
+                self.ids[key] = id
+            return id
+
+    def key(self, node):
+        '''Return the Zobrist key of a ground ASTNode without adding it to
+        the table.
+        '''
+        id = self.ids.get(term_key(node))
+        return _zobrist_key(str(node)) if id is None else self.keys[id]
+
+    def move(self, node):
+        '''Return the interned Move for a ground ASTNode.'''
+        id = self.intern(node)
+        try:
+            return self.moves[id]
+        except KeyError:
+            pass
+        with self._lock:
+            move = self.moves.get(id)
+            if move is None:
+                move = self.moves[id] = Move(self.terms[id], id, self.texts[id])
+            return move
+
+    def encode(self, nodes):
+        '''Return the State for an iterable of ground ASTNodes.'''
+        ids = frozenset(self.intern(node) for node in nodes)
+        hash = 0
+        for id in ids:
+            hash ^= self.keys[id]
+        return State(ids, hash)
+
+    def decode(self, state):
+        '''Return the ASTNodes of a State, sorted by id.'''
+        return [self.terms[id] for id in sorted(state.propositions)]
+
+    def from_bytes(self, data):
+        '''Rebuild a State serialized by State.to_bytes() with this table.'''
+        ids = struct.unpack('<%dI' % (len(data) // 4), data)
+        return State(frozenset(), 0).transition(ids, self)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -1,7 +1,13 @@
+import array
+import functools
+import itertools
+import random
+import time
 from gdl.ast import ASTNode
 from gdl.database import Database
 from gdl.lexer import Lexer
 from gdl.parser import Parser
+from gdl.state import Move, PropositionTable
 
 
 class GameError(Exception):
@@ -11,37 +17,152 @@ class GameError(Exception):
     ILLEGAL_MOVE = "Not a legal move: '(does %s %s)'"
     NO_TRUE_ALLOWED = "'true' facts are not allowed.  Use 'init/1' instead."
     NO_MOVES = 'The following players have not moved: %s.'
+    TOO_MANY_MOVES = 'Expected one move for each of %d players, got %d.'
+    NO_LEGAL_MOVES = "'%s' has no legal moves"
+    NO_UNDO = 'There are no applied moves to undo.'
 
 
-class StateMachine(object):
-    def __init__(self, database=None):
-        '''Create a new state machine.'''
-        self.db = database
-        self.players = set()
-        self.moves = set()
+class PlayoutReport(object):
+    def __init__(self):
+        '''Collect statistics for a batch of random playouts.'''
+        self.playouts = 0
+        self.total_depth = 0
+        self.elapsed = 0.0
+        self.goals = {}
 
-    ## PUBLIC API
+    def add(self, goals, depth):
+        '''Record the terminal scores and number of turns of one playout.'''
+        self.playouts += 1
+        self.total_depth += depth
+        for player, score in (goals or {}).items():
+            self.goals[player] = self.goals.get(player, 0) + score
+
+    def merge(self, other):
+        '''Add the statistics of another report to this one.'''
+        self.playouts += other.playouts
+        self.total_depth += other.total_depth
+        self.elapsed += other.elapsed
+        for player, score in other.goals.items():
+            self.goals[player] = self.goals.get(player, 0) + score
+
+    @property
+    def playouts_per_sec(self):
+        return self.playouts / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def average_depth(self):
+        return self.total_depth / self.playouts if self.playouts else 0.0
+
+    def average_goal(self, player):
+        '''Return the mean score of player over all playouts.'''
+        return self.goals.get(player, 0) / self.playouts if self.playouts else 0.0
+
+    def __repr__(self):
+        return '<PlayoutReport %d playouts, %.1f playouts/sec, depth %.2f>' % \
+                (self.playouts, self.playouts_per_sec, self.average_depth)
+
+
+class Game(object):
+    def __init__(self, database=None, **kwargs):
+        '''Compile GDL rules once so that many matches can share them.  Any
+        keyword arguments are passed on to store().
+
+        The rules, the initial state, and every static relation -- the
+        derived facts which depend on neither 'true' nor 'does' -- are held
+        in one Database.  A match created with new_match() only copies the
+        tables of that database, so it costs little more than its own
+        dynamic state.  A Game must not be changed once matches have been
+        created from it.
+        '''
+        self.db = database or Database()
+        self.roles = []
+        self.players = set()
+        self.propositions = PropositionTable()
+        if kwargs:
+            self.store(**kwargs)
 
     def store(self, **kwargs):
-        '''Read GDL rules into the datalog database.'''
-        self.db = self.db or Database()
-        tokens = Lexer.run_lex(**kwargs)
-        for tree in Parser.run_parse(tokens):
+        '''Read GDL rules into the game and derive its static relations.
+        Sentences are defined as soon as they are parsed, so a large file is
+        never held in memory as tokens.
+        '''
+        tokens = Lexer(kwargs.pop('scanner', Lexer.REGEX)).iter_lex(**kwargs)
+        for tree in Parser().iter_parse(tokens):
             if tree.is_true():
                 raise GameError(GameError.NO_TRUE_ALLOWED)
-            elif tree.is_init():
+            self.db.define(tree)
+            if tree.is_init():
                 true = tree.copy()
                 true.token.set(value='true')
                 self.db.define(true)
-            self.db.define(tree)
+        self.compile()
+
+    def compile(self):
+        '''Read the roles from the database and derive its static relations.
+        store() calls this; call it directly for a database which already
+        holds the rules.
+        '''
         try:
             roles = self.db.facts[('role', 1)]
         except KeyError:
             raise GameError(GameError.NO_PLAYERS)
-        self.players = set([str(x[0]) for x in roles])
+        self.roles = [str(x[0]) for x in roles]
+        self.players = set(self.roles)
+        self._derive_static_facts()
+
+    def new_match(self):
+        '''Return a StateMachine in the initial state of the game.'''
+        return StateMachine(game=self)
+
+    def static_predicates(self):
+        '''Return the rule predicates which depend on neither 'true' nor
+        'does'.
+        '''
+        dynamic = self.db.dependents('true', 1) | self.db.dependents('does', 2)
+        return [pred for pred in self.db.rules if pred not in dynamic]
+
+    def _derive_static_facts(self):
+        for term, arity in self.static_predicates():
+            query = ASTNode.new(term)
+            query.children = [ASTNode.new('?_%d' % i) for i in range(arity)]
+            self.db.query(query)
+
+
+class StateMachine(object):
+    def __init__(self, database=None, game=None):
+        '''Create a new state machine.  If a compiled Game is given, the
+        state machine starts a new match of it.
+        '''
+        self.db = database
+        self.game = game
+        self.roles = []
+        self.players = set()
+        self.moves = set()
+        self.propositions = PropositionTable()
+        self._state = None
+        self._trail = []
+        if game is not None:
+            self.db = game.db.copy()
+            self.roles = game.roles
+            self.players = game.players
+            self.propositions = game.propositions
+
+    ## PUBLIC API
+
+    def store(self, **kwargs):
+        '''Read GDL rules into the datalog database.'''
+        game = Game(self.db)
+        game.store(**kwargs)
+        self.db = game.db
+        self.roles = game.roles
+        self.players = game.players
+        self.propositions = game.propositions
+        self._state = None
 
     def move(self, player, move):
-        '''Store a does/2 fact in the database representing a player's move.'''
+        '''Store a does/2 fact in the database representing a player's move.
+        The move may be a string or a Move returned by legal_moves().
+        '''
         if player not in self.players:
             raise GameError(GameError.NO_SUCH_PLAYER % player)
         if player in self.moves:
@@ -62,25 +183,13 @@ class StateMachine(object):
             players = ', '.join(self.players - self.moves)
             raise GameError(GameError.NO_MOVES % players)
 
-        # calculate the new 'true' facts by querying for 'next'
-        state = ASTNode.new('?state')
-        next_query = ASTNode.new('next')
-        next_query.children = [state]
-        next_facts = [d[state.term] for d in self.db.query(next_query)]
+        next = self._spawn(self.db.copy())
+        next._state = self._state
+        next._advance()
 
-        # delete the 'does', 'true', and derived facts
-        self.db.facts.pop(('does', 2))
+        # the moves of this turn have been used up
+        self.db.retract_facts('does', 2)
         self.moves = set()
-        new_db = self.db.copy()
-        new_db.derived_facts = {}
-        new_db.facts.pop(('true', 1))
-
-        # replace 'true' facts with 'next' facts
-        for fact in next_facts:
-            new_db.define_fact('true', 1, [fact])
-
-        next = StateMachine(new_db)
-        next.players = self.players
         return next
 
     def score(self, player='?player'):
@@ -100,12 +209,48 @@ class StateMachine(object):
         if results is False:
             return None
         if not player.is_variable():
-            return int(results[0][score.term].term)
+            return _goal_value(results[0][score.term].term)
         ret = {}
         for var_dict in results:
-            ret[var_dict[player.term].term] = int(var_dict[score.term].term)
+            ret[var_dict[player.term].term] = _goal_value(var_dict[score.term].term)
         return ret
 
+    def score_many(self, states, player=None):
+        '''Return the scores of many States of this game at once.  Every
+        state is evaluated on one working database, so the static relations
+        and the goal query are only set up once.
+
+        If player is provided, return an array of its scores, one per state,
+        with -1 where no goal is defined.  Otherwise return a dict mapping
+        every player to such an array.
+
+        Raise GameError if player does not exist.
+        '''
+        if player is not None and player not in self.players:
+            raise GameError(GameError.NO_SUCH_PLAYER % player)
+        names = [player] if player is not None else sorted(self.players)
+        ret = dict((name, array.array('h')) for name in names)
+        var_player, score = ASTNode.new(player or '?player'), ASTNode.new('?score')
+        goal = ASTNode.new('goal')
+        goal.children = [var_player, score]
+        for fsm in self._each_state(states):
+            found = dict.fromkeys(names, -1)
+            for var_dict in fsm.db.query(goal) or []:
+                name = player or var_dict[var_player.term].term
+                found[name] = _goal_value(var_dict[score.term].term)
+            for name in names:
+                ret[name].append(found[name])
+        return ret if player is None else ret[player]
+
+    def terminal_many(self, states):
+        '''Return an array holding 1 for every terminal State of states and 0
+        for every other one.  Like score_many(), every state is evaluated on
+        one working database.
+        '''
+        terminal = ASTNode.new('terminal')
+        return array.array('b', (1 if fsm.db.query(terminal) else 0 \
+                for fsm in self._each_state(states)))
+
     def legal(self, player='?player', move='?move'):
         '''If player and move are provided, return whether or not the move is
         legal this turn.
@@ -114,31 +259,214 @@ class StateMachine(object):
 
         If neither is provided, return a dict of moves for all players where
         player names are keys.
+
+        The moves are interned like those of legal_moves(), so each one is
+        only rendered as a string the first time it is legal.
         '''
         move = self._single_move_to_ast(move)
         player = ASTNode.new(player)
         results = self._legal(player, move)
         if type(results) is bool:
             return results
-        elif not player.is_variable():
-            return [str(res[move.term]) for res in results]
+        table = self.propositions
+        if not player.is_variable():
+            return [table.move(res[move.term]).text for res in results]
         ret = {}
         for var_dict in results:
-            move_str = str(var_dict[move.term])
+            move_str = table.move(var_dict[move.term]).text
             ret.setdefault(var_dict[player.term].term, []).append(move_str)
         return ret
 
+    def legal_moves(self, player=None):
+        '''Return the legal moves this turn as interned Move objects, which
+        can be handed straight back to move() or apply() without parsing.
+
+        If player is provided, return a list of its moves.  Otherwise return a
+        dict of moves for all players where player names are keys.
+        '''
+        player = ASTNode.new(player or '?player')
+        move = ASTNode.new('?move')
+        table = self.propositions
+        results = self._legal(player, move) or []
+        if not player.is_variable():
+            return [table.move(res[move.term]) for res in results]
+        ret = {}
+        for var_dict in results:
+            ret.setdefault(var_dict[player.term].term, []).append(
+                    table.move(var_dict[move.term]))
+        return ret
+
+    def random_legal_move(self, player, rng=None):
+        '''Return a uniformly random legal Move for player, or None if it has
+        no legal moves.  Only the chosen move is interned; the other legal
+        facts are neither copied, collected into a list, nor turned into Moves
+        or strings.
+
+        Raise GameError if player does not exist.
+        '''
+        if player not in self.players:
+            raise GameError(GameError.NO_SUCH_PLAYER % player)
+        node = self._random_legal_move(player, rng or random)
+        return None if node is None else self.propositions.move(node)
+
     def is_terminal(self):
         '''Query terminal/0.'''
         return self.db.query(ASTNode.new('terminal'))
 
+    def apply(self, joint_move, successor=None):
+        '''Apply a joint move to this state machine in place and remember how
+        to undo() it.  Unlike next(), no new StateMachine or database copy is
+        created.  Any moves already made this turn are discarded.
+
+        joint_move is either a dict mapping every player to a move, or a tuple
+        of moves ordered by sorted player name as returned by
+        get_all_next_states().  Moves may be strings or ASTNodes; they are
+        not checked for legality.  If successor, the State the joint move is
+        already known to lead to (see TranspositionTable), is given, the
+        state is set to it without querying 'next'.
+
+        Raise GameError if a player is missing from joint_move, or if a tuple
+        holds more moves than there are players.
+        '''
+        names = sorted(self.players)
+        if isinstance(joint_move, dict):
+            missing = self.players - set(joint_move)
+            if missing:
+                raise GameError(GameError.NO_MOVES % ', '.join(missing))
+            joint_move = [joint_move[name] for name in names]
+        elif len(joint_move) < len(names):
+            raise GameError(GameError.NO_MOVES % ', '.join(names[len(joint_move):]))
+        elif len(joint_move) > len(names):
+            raise GameError(GameError.TOO_MANY_MOVES % (len(names), len(joint_move)))
+        does = []
+        for name, move in zip(names, joint_move):
+            does.append([ASTNode.new(name), self._single_move_to_ast(move)])
+
+        self.db.retract_facts('does', 2)
+        true = self.db.facts.get(('true', 1), [])
+        self._trail.append((true, self.db.derived_facts.copy(), self._state))
+        if successor is not None:
+            self._set_state([[term] for term in self.propositions.decode(successor)])
+            self._state = successor
+            return
+        self.db.replace_facts('does', 2, does)
+        self._advance()
+
+    def undo(self):
+        '''Restore the state from before the last apply().
+
+        Raise GameError if there is nothing to undo.
+        '''
+        try:
+            true, derived_facts, state = self._trail.pop()
+        except IndexError:
+            raise GameError(GameError.NO_UNDO)
+        self.db.facts[('true', 1)] = true
+        self.db.facts.pop(('does', 2), None)
+        self.db.derived_facts = derived_facts
+        self._state = state
+        self.moves = set()
+
+    def get_all_next_states(self):
+        '''Return a list of (joint_move, StateMachine) pairs, one for every
+        combination of legal moves this turn.  Each joint_move is a tuple of
+        interned Moves ordered by sorted player name.  Any moves already made
+        this turn are ignored.
+
+        All joint moves are evaluated against one working database, so the
+        derived facts which do not depend on 'does' are only computed once.
+
+        Raise GameError if a player has no legal moves.
+        '''
+        choices = self._legal_moves()
+        names = sorted(self.players)
+        players = [ASTNode.new(name) for name in names]
+        moves = [[self.propositions.move(m) for m in choices[name]] for name in names]
+        work = self._spawn(self.db.copy())
+        work.db.retract_facts('does', 2)
+        ret = []
+        for joint in itertools.product(*moves):
+            work.db.replace_facts('does', 2, [[player, move.node] \
+                    for player, move in zip(players, joint)])
+            next = self._spawn(work.db.copy())
+            next._state = self._state
+            next._set_state(work._query_next())
+            ret.append((joint, next))
+        return ret
+
+    def playout(self, rng=None):
+        '''Play random legal joint moves until a terminal state is reached.
+        This state machine is left untouched; any moves already made this
+        turn are ignored.
+
+        Return a tuple of the terminal scores, as returned by score(), and the
+        number of turns played.
+
+        Raise GameError if a player has no legal moves in a non-terminal
+        state.
+        '''
+        rng = rng or random
+        fsm = self._spawn(self.db.copy())
+        fsm.db.retract_facts('does', 2)
+        depth = 0
+        while not fsm.is_terminal():
+            fsm._random_joint_move(rng)
+            fsm._advance()
+            depth += 1
+        return fsm.score(), depth
+
+    def depth_charge(self, rng=None):
+        '''Return the terminal scores of a single random playout.'''
+        return self.playout(rng)[0]
+
+    def run_playouts(self, count, rng=None):
+        '''Run count random playouts from this state and return a
+        PlayoutReport with the accumulated scores, depths, and throughput.
+        '''
+        report = PlayoutReport()
+        start = time.perf_counter()
+        for _ in range(count):
+            report.add(*self.playout(rng))
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def state(self):
+        '''Return the canonical State of the 'true' facts this turn.'''
+        if self._state is None:
+            facts = self.db.facts.get(('true', 1), [])
+            self._state = self.propositions.encode(args[0] for args in facts)
+        return self._state
+
+    def restore(self, state):
+        '''Return a new StateMachine for the same game whose 'true' facts are
+        those of state.  State must come from this game's PropositionTable.
+        '''
+        fsm = self._spawn(self.db.copy())
+        facts = [[term] for term in self.propositions.decode(state)]
+        fsm.db.replace_facts('true', 1, facts)
+        fsm.db.retract_facts('does', 2)
+        fsm._state = state
+        return fsm
+
+    def canonicalize(self, symmetries):
+        '''Replace the state of this state machine in place with the
+        canonical state of its symmetry class and return the Symmetry which
+        maps the old state onto it.  If called after apply(), the next undo()
+        also undoes this.
+
+        symmetries is a gdl.symmetry.Symmetries for this game.
+        '''
+        state, symmetry = symmetries.canonical(self.state())
+        if symmetry is not symmetries.identity:
+            self._set_state([[term] for term in self.propositions.decode(state)])
+        return symmetry
+
     def __hash__(self):
-        ret = int()
-        true_strings = [str(res[0]) for res in self.db.facts[('true', 1)]]
-        does_strings = [(str(res[0]), str(res[1])) \
-                for res in self.db.facts.get(('does', 2), [])]
-        for state in sorted(true_strings) + sorted(does_strings, key=lambda x: x[0]):
-            ret ^= hash(state)
+        ret = self.state().hash
+        for player, move in self.db.facts.get(('does', 2), []):
+            does = ASTNode.new('does')
+            does.children = [player, move]
+            ret ^= self.propositions.key(does)
         return ret
 
     ## HELPERS
@@ -149,6 +477,117 @@ class StateMachine(object):
         legal.children = [player, move]
         return self.db.query(legal)
 
+    def _spawn(self, database):
+        '''Create a StateMachine for the same game around database.'''
+        fsm = StateMachine(database)
+        fsm.game = self.game
+        fsm.roles = self.roles
+        fsm.players = self.players
+        fsm.propositions = self.propositions
+        return fsm
+
+    def _each_state(self, states):
+        '''Yield one working StateMachine, set to each State in turn.'''
+        fsm = self._spawn(self.db.copy())
+        fsm.db.retract_facts('does', 2)
+        for state in states:
+            facts = [[term] for term in self.propositions.decode(state)]
+            fsm.db.replace_facts('true', 1, facts)
+            fsm._state = state
+            yield fsm
+
+    def _advance(self):
+        '''Replace the 'true' facts with the 'next' facts in place.'''
+        self._set_state(self._query_next())
+
+    def _query_next(self):
+        '''Return the 'next' facts as a list of fact arguments.'''
+        state = ASTNode.new('?state')
+        next_query = ASTNode.new('next')
+        next_query.children = [state]
+        return [[d[state.term]] for d in self.db.query(next_query) or []]
+
+    def _set_state(self, facts):
+        '''Replace the 'true' facts in place and clear the moves.  Derived
+        facts which do not depend on the game state are kept.
+        '''
+        self.db.replace_facts('true', 1, facts)
+        if self._state is not None:
+            ids = [self.propositions.intern(args[0]) for args in facts]
+            self._state = self._state.transition(ids, self.propositions)
+        self.db.retract_facts('does', 2)
+        self.moves = set()
+
+    def _legal_moves(self):
+        '''Return a dict mapping every player to a list of legal move
+        ASTNodes.
+
+        Raise GameError if a player has no legal moves.
+        '''
+        player, move = ASTNode.new('?player'), ASTNode.new('?move')
+        choices = {}
+        for var_dict in self._legal(player, move) or []:
+            choices.setdefault(var_dict[player.term].term, []).append(var_dict[move.term])
+        for name in self.players:
+            if name not in choices:
+                raise GameError(GameError.NO_LEGAL_MOVES % name)
+        return choices
+
+    def _random_legal_move(self, player, rng):
+        '''Return a random legal move ASTNode for player, or None.  The legal
+        facts are scanned once, keeping one of them by reservoir sampling, so
+        no list of moves is built.
+        '''
+        legal = ASTNode.new('legal')
+        legal.children = [ASTNode.new(player), ASTNode.new('?move')]
+        choice = None
+        for count, args in enumerate(self.db.iter_matching_facts(legal), 1):
+            if rng.randrange(count) == 0:
+                choice = args[1]
+        return choice
+
+    def _random_joint_move(self, rng):
+        '''Store a uniformly random legal move for every player, sampled in
+        one scan of the legal facts.
+
+        Raise GameError if a player has no legal moves.
+        '''
+        legal = ASTNode.new('legal')
+        legal.children = [ASTNode.new('?player'), ASTNode.new('?move')]
+        counts, choices = {}, {}
+        for player, move in self.db.iter_matching_facts(legal):
+            name = player.term
+            count = counts[name] = counts.get(name, 0) + 1
+            if rng.randrange(count) == 0:
+                choices[name] = move
+        does = []
+        for name in sorted(self.players):
+            if name not in choices:
+                raise GameError(GameError.NO_LEGAL_MOVES % name)
+            does.append([ASTNode.new(name), choices[name]])
+        self.db.replace_facts('does', 2, does)
+        self.moves = set(self.players)
+
     def _single_move_to_ast(self, move):
-        '''Converts the move string to an ASTNode.'''
-        return Parser.run_parse(Lexer.run_lex(data=move))[0]
+        '''Converts a move string or Move to an ASTNode.  ASTNodes are
+        returned as they are.
+        '''
+        if isinstance(move, Move):
+            return move.node
+        if isinstance(move, str):
+            return _parse_move(move)
+        return move
+
+
+@functools.lru_cache(maxsize=256)
+def _goal_value(term):
+    '''Parse a goal value.'''
+    return int(term)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_move(move):
+    '''Parse a move string.  The results are cached and shared, so they must
+    not be modified.
+    '''
+    return Parser.run_parse(Lexer.run_lex(data=move))[0]
@@ -0,0 +1,208 @@
+import itertools
+from collections import Counter
+from gdl.ast import ASTNode
+from gdl.lexer import Lexeme
+from gdl.state import State
+
+
+class Symmetry(object):
+    def __init__(self, mapping):
+        '''A permutation of the constants of a game which maps its rules onto
+        themselves.  mapping is a dict from constant to constant; constants
+        which are not in it are fixed.
+        '''
+        self.mapping = mapping
+        self._inverse = None
+        self._ids = {}
+
+    @property
+    def inverse(self):
+        '''The Symmetry which undoes this one.'''
+        if self._inverse is None:
+            self._inverse = Symmetry(dict((b, a) for a, b in self.mapping.items()))
+            self._inverse._inverse = self
+        return self._inverse
+
+    def apply(self, node):
+        '''Return the image of a ground ASTNode.'''
+        if not node.children:
+            term = self.mapping.get(node.term)
+            return node if term is None else ASTNode.new(term)
+        head = ASTNode.new(node.term)
+        stack = [(node, head)]
+        while stack:
+            node, image = stack.pop()
+            for child in node.children:
+                if child.children:
+                    stack.append((child, image.create_child(Lexeme.new(child.term))))
+                else:
+                    term = self.mapping.get(child.term)
+                    image.children.append(child if term is None else ASTNode.new(term))
+        return head
+
+    def map_state(self, state, table):
+        '''Return the image of a State interned in table.'''
+        if not self.mapping:
+            return state
+        ids = [self._map_id(id, table) for id in state.propositions]
+        return State(frozenset(), 0).transition(ids, table)
+
+    def map_move(self, move, table):
+        '''Return the image of a Move interned in table.'''
+        if not self.mapping:
+            return move
+        return table.move(table.terms[self._map_id(move.id, table)])
+
+    def _map_id(self, id, table):
+        try:
+            return self._ids[id]
+        except KeyError:
+            image = self._ids[id] = table.intern(self.apply(table.terms[id]))
+            return image
+
+    def __repr__(self):
+        return '<Symmetry %s>' % ' '.join('%s->%s' % x for x in sorted(self.mapping.items()))
+
+
+class Symmetries(object):
+    def __init__(self, game, limit=10000):
+        '''Find the symmetries of a compiled Game: the permutations of its
+        constants which map its rules and facts onto themselves.
+
+        Role names and goal values are never permuted, so a symmetric state
+        has the same legal moves (up to the permutation), the same goals and
+        the same value for every player.  Only constants which occur the
+        same number of times in the same places are tried against each
+        other, and at most limit candidate permutations are checked.
+
+        Attributes:
+        symmetries -- a list of Symmetry objects, the identity first
+        '''
+        self.game = game
+        self.table = game.propositions
+        self.identity = Symmetry({})
+        self.symmetries = [self.identity] + self._find(limit)
+
+    ## PUBLIC API
+
+    def canonical(self, state):
+        '''Return the canonical State of the symmetry class of state and the
+        Symmetry which maps state onto it.
+        '''
+        best, best_symmetry = state, self.identity
+        for symmetry in self.symmetries[1:]:
+            image = symmetry.map_state(state, self.table)
+            if image.hash < best.hash:
+                best, best_symmetry = image, symmetry
+        return best, best_symmetry
+
+    def __len__(self):
+        return len(self.symmetries)
+
+    ## HELPERS
+
+    def _find(self, limit):
+        db = self.game.db
+        fixed = set(self.game.roles)
+        for args, _ in db.rules.get(('goal', 2), []):
+            fixed.add(args[1].term)
+        for args in db.facts.get(('goal', 2), []):
+            fixed.add(args[1].term)
+
+        counts = {}
+        for pred, facts in db.facts.items():
+            for args in facts:
+                _count_args(pred, args, counts)
+        for pred, rules in db.rules.items():
+            for args, body in rules:
+                _count_args(pred, args, counts)
+                for literal in body:
+                    _count_literal(literal, counts)
+
+        groups = {}
+        for constant, places in counts.items():
+            if constant not in fixed:
+                groups.setdefault(frozenset(places.items()), []).append(constant)
+        groups = [sorted(group) for group in groups.values() if len(group) > 1]
+
+        original = self._sentences({})
+        found = []
+        candidates = itertools.product(*[itertools.permutations(g) for g in groups])
+        for images in itertools.islice(candidates, limit):
+            mapping = {}
+            for group, image in zip(groups, images):
+                mapping.update((a, b) for a, b in zip(group, image) if a != b)
+            if mapping and self._sentences(mapping) == original:
+                found.append(Symmetry(mapping))
+        return found
+
+    def _sentences(self, mapping):
+        '''Return the facts and rules of the game with mapping applied, in a
+        form which does not depend on their order.
+        '''
+        db = self.game.db
+        ret = set()
+        for pred, facts in db.facts.items():
+            for args in facts:
+                ret.add((pred, tuple(_key(x, mapping) for x in args)))
+        for pred, rules in db.rules.items():
+            for args, body in rules:
+                ret.add((pred, tuple(_key(x, mapping) for x in args),
+                        frozenset(_literal_key(x, mapping) for x in body)))
+        return ret
+
+
+def _key(node, mapping):
+    '''Return a hashable key for a term with mapping applied to its
+    constants: the constant itself, or a flat tuple of the term and arity of
+    every node in preorder, which can be compared at any depth.
+    '''
+    if not node.children:
+        return mapping.get(node.term, node.term)
+    ret = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            ret.extend((node.term, len(node.children)))
+            stack.extend(reversed(node.children))
+        else:
+            ret.extend((mapping.get(node.term, node.term), 0))
+    return tuple(ret)
+
+
+def _literal_key(literal, mapping):
+    ret = []
+    stack = [literal]
+    while stack:
+        literal = stack.pop()
+        ret.extend((literal.term, len(literal.children)))
+        if literal.is_not() or literal.is_or():
+            stack.extend(reversed(literal.children))
+        else:
+            ret.extend(_key(x, mapping) for x in literal.children)
+    return tuple(ret)
+
+
+def _count_args(pred, args, counts, path=()):
+    stack = [(pred, args, path)]
+    while stack:
+        pred, args, path = stack.pop()
+        for i, arg in enumerate(args):
+            place = path + (pred, i)
+            if arg.is_variable():
+                continue
+            if arg.children:
+                stack.append((arg.predicate, arg.children, place))
+            else:
+                counts.setdefault(arg.term, Counter())[place] += 1
+
+
+def _count_literal(literal, counts):
+    stack = [literal]
+    while stack:
+        literal = stack.pop()
+        if literal.is_not() or literal.is_or():
+            stack.extend(literal.children)
+        else:
+            _count_args(literal.predicate, literal.children, counts)
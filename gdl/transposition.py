@@ -0,0 +1,127 @@
+from collections import OrderedDict
+
+
+class Entry(object):
+    __slots__ = ('state', 'depth', 'terminal', 'goals', 'legal', 'successors', 'value')
+
+    def __init__(self, state, depth=0):
+        '''Create the cached results for a State.
+
+        Attributes:
+        depth -- how deep the state has been searched; used by the 'depth'
+            replacement policy
+        terminal -- the result of StateMachine.is_terminal()
+        goals -- the result of StateMachine.score() for terminal states
+        legal -- the result of StateMachine.legal_moves() for non-terminal
+            states
+        successors -- a dict mapping joint moves to successor States
+        value -- free for search algorithms to store an evaluation in
+        '''
+        self.state = state
+        self.depth = depth
+        self.terminal = None
+        self.goals = None
+        self.legal = None
+        self.successors = {}
+        self.value = None
+
+
+class TranspositionTable(object):
+    LRU = 'lru'
+    DEPTH = 'depth'
+
+    def __init__(self, size=100000, policy=LRU):
+        '''Create a table holding at most size entries keyed on States.
+
+        With the 'lru' policy the least recently used entry is evicted when
+        the table is full.  With the 'depth' policy every state maps to one
+        of size slots by its hash, and a colliding entry only replaces the
+        current one if it has been searched at least as deep.
+        '''
+        if policy not in (self.LRU, self.DEPTH):
+            raise ValueError('unknown replacement policy: %r' % policy)
+        if size < 1:
+            raise ValueError('size must be positive')
+        self.size = size
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clear()
+
+    ## PUBLIC API
+
+    def get(self, state):
+        '''Return the Entry for state or None.  Updates the hit statistics.'''
+        if self.policy == self.LRU:
+            entry = self.entries.get(state)
+            if entry is not None:
+                self.entries.move_to_end(state)
+        else:
+            entry = self.slots[state.hash % self.size]
+            if entry is not None and entry.state != state:
+                entry = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, entry):
+        '''Store an Entry, evicting another one if the table is full.
+
+        Return whether or not the entry was stored.
+        '''
+        if self.policy == self.LRU:
+            self.entries[entry.state] = entry
+            self.entries.move_to_end(entry.state)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            return True
+        index = entry.state.hash % self.size
+        current = self.slots[index]
+        if current is None:
+            self.count += 1
+        elif current.state != entry.state:
+            if current.depth > entry.depth:
+                return False
+            self.evictions += 1
+        self.slots[index] = entry
+        return True
+
+    def lookup(self, machine, depth=0):
+        '''Return the Entry for the state of machine.  On a miss, query the
+        machine for its terminal flag and its goals or legal moves and store
+        the new entry.
+        '''
+        entry = self.get(machine.state())
+        if entry is None:
+            entry = Entry(machine.state(), depth)
+            entry.terminal = bool(machine.is_terminal())
+            if entry.terminal:
+                entry.goals = machine.score()
+            else:
+                entry.legal = machine.legal_moves()
+            self.put(entry)
+        return entry
+
+    def clear(self):
+        '''Remove every entry.  The statistics are kept.'''
+        self.entries = OrderedDict()
+        self.slots = [None] * self.size if self.policy == self.DEPTH else None
+        self.count = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self.entries) if self.policy == self.LRU else self.count
+
+    def __contains__(self, state):
+        if self.policy == self.LRU:
+            return state in self.entries
+        entry = self.slots[state.hash % self.size]
+        return entry is not None and entry.state == state
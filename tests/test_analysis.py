@@ -0,0 +1,88 @@
+import unittest
+from gdl.analysis import GameAnalysis
+from gdl.lexer import Lexer
+from gdl.parser import Parser
+from gdl.search import AlphaBeta, MCTS
+from gdl.state_machine import Game
+from tests.test_search import GAME as PICK_GAME
+from tests.test_symmetry import COUNTER, DEEP_GAME
+
+
+# blank cells can be marked once; marks stay for the rest of the game
+GAME = '''
+(role x)
+(init (cell 1 b))
+(init (cell 2 b))
+(init (alive))
+(init (step 0))
+(<= (legal x (mark ?n)) (true (cell ?n b)))
+(<= (next (cell ?n x)) (does x (mark ?n)))
+(<= (next (cell ?n ?w)) (true (cell ?n ?w)) (distinct ?w b))
+(<= (next (cell ?n b)) (true (cell ?n b)) (not (does x (mark ?n))))
+(<= (next (alive)) (true (alive)))
+(<= (next (step 1)) (true (step 0)))
+(<= terminal (not (true (cell 1 b))) (not (true (cell 2 b))))
+(<= (goal x 100) (true (cell 1 x)))
+(<= (goal x 0) (true (cell 1 b)))
+'''
+
+
+def parse(text):
+    return Parser.run_parse(Lexer.run_lex(data=text))[0]
+
+
+class TestGameAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.analysis = GameAnalysis(Game(data=GAME))
+
+    def test_latches(self):
+        self.assertEqual(2, len(self.analysis.latches))
+        self.assertTrue(self.analysis.is_latched(parse('(cell 1 x)')))
+        self.assertTrue(self.analysis.is_latched(parse('(alive)')))
+        self.assertFalse(self.analysis.is_latched(parse('(cell 1 b)')))
+        self.assertFalse(self.analysis.is_latched(parse('(cell 1 ?w)')))
+        self.assertFalse(self.analysis.is_latched(parse('(step 0)')))
+
+    def test_inhibitors(self):
+        self.assertEqual(['(cell ?n b)', 'alive'],
+                sorted(str(x) for x in self.analysis.inhibitors))
+        self.assertTrue(self.analysis.is_inhibited(parse('(cell 2 b)')))
+        self.assertFalse(self.analysis.is_inhibited(parse('(cell 2 x)')))
+        self.assertFalse(self.analysis.is_inhibited(parse('(step 1)')))
+
+    def test_constants(self):
+        self.assertEqual(['alive'], [str(x) for x in self.analysis.constants])
+
+    def test_deep_terms(self):
+        analysis = GameAnalysis(Game(data=DEEP_GAME))
+        self.assertTrue(analysis.is_latched(parse('(count %s)' % COUNTER)))
+        self.assertEqual(3, len(analysis.constants))
+        self.assertTrue(analysis.goals_monotone)
+        self.assertEqual({'x': 100}, analysis.decided_goals(analysis.game.new_match()))
+
+    def test_goals_not_monotone(self):
+        self.assertFalse(self.analysis.goals_monotone)
+        self.assertIsNone(self.analysis.decided_goals(self.analysis.game.new_match()))
+
+    def test_decided_goals(self):
+        analysis = GameAnalysis(Game(data=PICK_GAME))
+        self.assertTrue(analysis.goals_monotone)
+        fsm = analysis.game.new_match()
+        self.assertIsNone(analysis.decided_goals(fsm))
+        fsm.apply({'x': 'b', 'o': 'noop'})
+        self.assertFalse(fsm.is_terminal())
+        self.assertEqual({'x': 50, 'o': 50}, analysis.decided_goals(fsm))
+        fsm.undo()
+        fsm.apply({'x': 'a', 'o': 'noop'})
+        self.assertIsNone(analysis.decided_goals(fsm))
+
+    def test_search_cutoffs(self):
+        analysis = GameAnalysis(Game(data=PICK_GAME))
+        search = AlphaBeta(analysis.game.new_match(), 'x', analysis=analysis)
+        self.assertEqual('b', str(search.search(depth=5)))
+        self.assertEqual(50, search.value)
+        search = MCTS(analysis.game.new_match(), 'x', analysis=analysis)
+        search.search(iterations=50)
+        decided = [node for node in search.root.children.values() if node.decided]
+        self.assertTrue(decided)
+        self.assertTrue(all(not node.children for node in decided))
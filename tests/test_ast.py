@@ -10,6 +10,9 @@ class MockToken(object):
         self.lineno = lineno,
         self.column = col
 
+    def is_variable(self):
+        return self.value.startswith('?')
+
     def copy(self):
         return MockToken(self.filename, self.line, self.lineno, self.column, self.value)
 
@@ -44,3 +47,19 @@ class TestASTNode(unittest.TestCase):
         b = self._new_tree()
         b.children[0].children[0].token.value = 'player'
         self.assertNotEqual(a, b)
+
+    def test_deep_terms(self):
+        def counter(depth, value='0'):
+            node = ASTNode(MockToken(None, None, None, None, value))
+            for _ in range(depth):
+                parent = ASTNode(MockToken(None, None, None, None, 's'))
+                parent.children = [node]
+                node = parent
+            return node
+        a = counter(20000)
+        b = a.copy()
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, counter(20000, '1'))
+        self.assertEqual(repr(a), '(s ' * 20000 + '0' + ')' * 20000)
+        c = counter(20000, '?x').set_variables({'?x': counter(1)})
+        self.assertEqual(c, counter(20001))
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from gdl import Database, Lexer, Parser
+from gdl.cache import GameCache, dump_database, load_database
+from gdl.lexer import NoInputError
+from tests.test_search import GAME
+
+
+class TestGameCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = GameCache(os.path.join(self.directory, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_dump_and_load_database(self):
+        db = Database()
+        with open('samples/test.kif') as fp:
+            for tree in Parser().iter_parse(Lexer().iter_lex(file=fp)):
+                db.define(tree)
+        query = Parser.run_parse(Lexer.run_lex(data='(path 1 ?y)'))[0]
+        expected = sorted(str(x['?y']) for x in db.query(query))
+        loaded = load_database(dump_database(db))
+        self.assertEqual(sorted(db.rules), sorted(loaded.rules))
+        self.assertEqual(db.requirements, loaded.requirements)
+        self.assertEqual(expected, sorted(str(x['?y']) for x in loaded.query(query)))
+        self.assertEqual(['path'], [pred[0] for pred in loaded.derived_facts])
+
+    def test_deep_terms(self):
+        db = Database()
+        text = '(count %sz%s)' % ('(s ' * 3000, ')' * 3000)
+        db.define(Parser.run_parse(Lexer.run_lex(data=text))[0])
+        loaded = load_database(dump_database(db))
+        self.assertEqual(db.facts[('count', 1)], loaded.facts[('count', 1)])
+
+    def test_game(self):
+        game = self.cache.game(GAME)
+        self.assertEqual((0, 1), (self.cache.hits, self.cache.misses))
+        self.assertTrue(os.path.exists(self.cache.path(GAME)))
+        cached = GameCache(self.cache.directory).game(GAME)
+        self.assertEqual(game.roles, cached.roles)
+        self.assertEqual(sorted(game.db.derived_facts), sorted(cached.db.derived_facts))
+        fsm = cached.new_match()
+        fsm.apply({'x': 'b', 'o': 'noop'})
+        fsm.apply({'x': 'noop', 'o': 'c'})
+        self.assertEqual({'x': 50, 'o': 50}, fsm.score())
+
+    def test_game_files(self):
+        filename = os.path.join(self.directory, 'game.kif')
+        with open(filename, 'w') as fp:
+            fp.write(GAME)
+        self.cache.game(files=[filename])
+        self.cache.game(files=[filename])
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        with open(filename, 'a') as fp:
+            fp.write('(<= (goal x 25) (true (picked z)))')
+        self.cache.game(files=[filename])
+        self.assertEqual((1, 2), (self.cache.hits, self.cache.misses))
+
+    def test_game_corrupt_file(self):
+        with open(self.cache.path(GAME), 'wb') as fp:
+            fp.write(b'not a cache file')
+        self.assertEqual(['x', 'o'], self.cache.game(GAME).roles)
+        self.assertEqual((0, 1), (self.cache.hits, self.cache.misses))
+        self.cache.game(GAME)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_game_no_input_error(self):
+        with self.assertRaises(NoInputError):
+            self.cache.game()
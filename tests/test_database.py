@@ -1,5 +1,6 @@
 import unittest
 from gdl import Database, DatalogError
+from gdl.ast import ASTNode
 
 
 class MockToken(object):
@@ -209,6 +210,13 @@ class TestDatabase(unittest.TestCase):
         results = self.db.query(bar)
         self.assertEqual(results, [{'?x': answer}])
 
+    def test_fact_query_match_nested(self):
+        args = [make_mock_node('?y'), make_mock_node('x', [make_mock_node(x) for x in ('?a', '3')])]
+        results = [{k: d[k].term for k in d} for d in self.db.query(make_mock_node('bar', args))]
+        self.assertEqual(results, [{'?y': '1', '?a': '2'}])
+        args = [make_mock_node('1'), make_mock_node('x', [make_mock_node('?a')])]
+        self.assertFalse(self.db.query(make_mock_node('bar', args)))
+
     def test_fact_query_repeat_variables(self):
         answer = [{'?1': 'x', '?2': 'y'}, {'?1': 'a', '?2': 'a'}]
         args = [make_mock_node(x) for x in ('?1', '?2', '?1')]
@@ -332,3 +340,50 @@ class TestDatabase(unittest.TestCase):
         results = self.db.query(make_mock_node('not-y', [make_mock_node('?x')]))
         results = [{k: d[k].term for k in d} for d in results]
         self.assertEqual(results, [{'?x': '3'}, {'?x': '4'}])
+
+    def test_matching_facts(self):
+        query = make_mock_node('path', [make_mock_node('1'), make_mock_node('?y')])
+        facts = self.db.matching_facts(query)
+        self.assertEqual(['2', '3', '4'], sorted(args[1].term for args in facts))
+        query = make_mock_node('path', [make_mock_node('?x'), make_mock_node('?x')])
+        self.assertEqual([], self.db.matching_facts(query))
+        query = make_mock_node('path', [make_mock_node('1'), make_mock_node('?y')])
+        facts = self.db.iter_matching_facts(query)
+        self.assertEqual(['2', '3', '4'], sorted(args[1].term for args in facts))
+        with self.assertRaises(DatalogError):
+            self.db.matching_facts(make_mock_node('nothing'))
+
+    def test_deep_fact(self):
+        def counter(depth, value='0'):
+            node = ASTNode.new(value)
+            for _ in range(depth):
+                parent = ASTNode.new('s')
+                parent.children = [node]
+                node = parent
+            return node
+        self.db.define_fact('count', 1, [counter(20000)])
+        query = ASTNode.new('count')
+        query.children = [counter(19999, '?x')]
+        results = self.db.query(query)
+        self.assertEqual(results, [{'?x': counter(1)}])
+        with self.assertRaises(DatalogError):
+            self.db.define_fact('count', 1, [counter(20000, '?x')])
+
+    def test_deep_rule(self):
+        def counter(depth, value='0'):
+            node = ASTNode.new(value)
+            for _ in range(depth):
+                parent = ASTNode.new('s')
+                parent.children = [node]
+                node = parent
+            return node
+        self.db.define_fact('count', 1, [counter(3000)])
+        body = ASTNode.new('count')
+        body.children = [counter(2999, '?x')]
+        self.db.define_rule('base', 1, [ASTNode.new('?x')], [body])
+        base = ASTNode.new('base')
+        base.children = [ASTNode.new('?x')]
+        self.db.define_rule('big', 1, [counter(3000, '?x')], [base])
+        query = ASTNode.new('big')
+        query.children = [ASTNode.new('?y')]
+        self.assertEqual(self.db.query(query), [{'?y': counter(3001)}])
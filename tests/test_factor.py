@@ -0,0 +1,65 @@
+import unittest
+from gdl.factor import FactoredGame
+from gdl.state_machine import Game
+from tests.test_search import GAME as PICK_GAME
+
+
+# two switches which are turned on independently; both must be on to win
+GAME = '''
+(role x)
+(init (a off))
+(init (b off))
+(init (step 0))
+(succ 0 1)
+(succ 1 2)
+(<= (legal x flipa) (true (a off)))
+(<= (legal x flipb) (true (b off)))
+(<= (next (a on)) (does x flipa))
+(<= (next (a ?s)) (true (a ?s)) (not (does x flipa)))
+(<= (next (b on)) (does x flipb))
+(<= (next (b ?s)) (true (b ?s)) (not (does x flipb)))
+(<= (next (step ?n)) (true (step ?m)) (succ ?m ?n))
+(<= terminal (true (step 2)))
+(<= (goal x 100) (true (a on)) (true (b on)))
+(<= (goal x 0) (true (a off)))
+(<= (goal x 0) (true (b off)))
+'''
+
+
+class TestFactoredGame(unittest.TestCase):
+    def setUp(self):
+        self.game = Game(data=GAME)
+        self.factored = FactoredGame(self.game)
+
+    def test_factors(self):
+        self.assertTrue(self.factored.is_factored())
+        factors = sorted(self.factored.factors, key=repr)
+        self.assertEqual([set([('a', 1)]), set([('b', 1)])], [f.fluents for f in factors])
+        self.assertEqual([set([('flipa', 0)]), set([('flipb', 0)])], [f.moves for f in factors])
+        self.assertEqual(set([('step', 1)]), self.factored.shared)
+
+    def test_not_factored(self):
+        factored = FactoredGame(Game(data=PICK_GAME))
+        self.assertFalse(factored.is_factored())
+        self.assertEqual(1, len(factored.factors))
+
+    def test_factor_games(self):
+        for factor in self.factored.factors:
+            fsm = factor.game.new_match()
+            self.assertEqual(1, len(fsm.legal_moves('x')))
+            self.assertFalse(fsm.is_terminal())
+            self.assertEqual({'x': 0}, fsm.score())
+
+    def test_split_join(self):
+        fsm = self.game.new_match()
+        fsm.apply({'x': 'flipb'})
+        parts = self.factored.split(fsm)
+        for factor, part in zip(self.factored.factors, parts):
+            if ('a', 1) in factor.fluents:
+                self.assertEqual(['flipa'], [str(m) for m in part.legal_moves('x')])
+                part.apply({'x': 'flipa'})
+            else:
+                self.assertEqual([], part.legal_moves('x'))
+        joined = self.factored.join(parts)
+        self.assertTrue(joined.is_terminal())
+        self.assertEqual({'x': 100}, joined.score())
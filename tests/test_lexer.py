@@ -95,3 +95,56 @@ class TestLexer(unittest.TestCase):
                         (ancestor ?b ?c)) ;NOTE: this is recursive'''
         tokens = list(t.value for t in Lexer().lex(string))
         self.assertEqual(tokens, answer)
+
+    def test_lex_scanners_agree(self):
+        with open('samples/test.kif') as fp:
+            data = fp.read()
+        data += '\n(FOO  (Bar ?X))\t(baz)'
+        def lex(scanner):
+            return [(t.value, t.line, t.lineno, t.column) \
+                    for t in Lexer(scanner).lex(data)]
+        self.assertEqual(lex(Lexer.CHAR), lex(Lexer.REGEX))
+
+    def test_lex_comment_ends_token(self):
+        tokens = list(t.value for t in Lexer().lex('(foo bar;baz\nqux)'))
+        self.assertEqual(tokens, ['(', 'foo', 'bar', 'qux', ')'])
+
+    def test_lex_unknown_scanner_error(self):
+        with self.assertRaises(ValueError):
+            Lexer('nonsense')
+
+    def test_iter_lex(self):
+        lines = ['(role x)\n', '(role o)\n']
+        read = []
+        class Lines(object):
+            name = '__mock__'
+            def __iter__(self):
+                for line in lines:
+                    read.append(line)
+                    yield line
+        tokens = Lexer().iter_lex(file=Lines())
+        self.assertEqual(['(', 'role', 'x', ')'], [next(tokens).value for _ in range(4)])
+        self.assertEqual(1, len(read))
+        self.assertEqual([(2, 2)], [(t.lineno, t.column) for t in tokens if t.value == 'role'])
+        self.assertEqual(2, len(read))
+
+    def test_iter_lex_no_input_error(self):
+        with self.assertRaises(NoInputError):
+            Lexer().iter_lex()
+
+    def test_lex_file_lines(self):
+        with open('samples/test.kif') as fp:
+            tokens = Lexer().lex(file=fp)
+        self.assertEqual('samples/test.kif', tokens[0].filename)
+        self.assertEqual('(link 1 2) (link 2 3) (link 3 4)\n', tokens[0].line)
+        fp = MockFile('(role x)\n')
+        tokens = Lexer().lex(file=fp)
+        self.assertEqual('__mock__', tokens[0].filename)
+        self.assertEqual('', tokens[0].line)
+
+    def test_lexeme_compact(self):
+        token = Lexer().lex('(role x)')[1]
+        self.assertFalse(hasattr(token, '__dict__'))
+        copy = token.copy()
+        self.assertEqual('role', copy.value)
+        self.assertEqual((None, None, None), (copy.source, copy.line, copy.lineno))
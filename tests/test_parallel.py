@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from gdl import Database, DatalogError, ParseError, StateMachine
+from gdl.parallel import PlayoutPool, load_files, parse_files
+
+
+GAME = '''
+(role x)
+(role o)
+(init (step 0))
+(succ 0 1) (succ 1 2) (succ 2 3)
+(<= (legal ?player left) (role ?player))
+(<= (legal ?player right) (role ?player))
+(<= (next (step ?y)) (true (step ?x)) (succ ?x ?y))
+(<= (next (last ?player ?move)) (does ?player ?move))
+(<= terminal (true (step 3)))
+(<= (goal ?player 100) (true (last ?player left)))
+(<= (goal ?player 0) (true (last ?player right)))
+'''
+
+
+class TestPlayoutPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fsm = StateMachine()
+        cls.fsm.store(data=GAME)
+        cls.pool = PlayoutPool(cls.fsm, processes=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_run_playouts(self):
+        report = self.pool.run_playouts(self.fsm, 10, seed=1)
+        self.assertEqual(10, report.playouts)
+        self.assertEqual(3.0, report.average_depth)
+        self.assertGreater(report.playouts_per_sec, 0)
+
+    def test_run_playouts_is_reproducible(self):
+        one = self.pool.run_playouts(self.fsm, 10, seed=5, batch=3)
+        two = self.pool.run_playouts(self.fsm, 10, seed=5, batch=3)
+        self.assertEqual(one.goals, two.goals)
+
+    def test_imap_playouts(self):
+        reports = list(self.pool.imap_playouts(self.fsm, 9, seed=2, batch=4))
+        self.assertEqual([1, 4, 4], sorted(r.playouts for r in reports))
+
+    def test_evaluate_children(self):
+        self.fsm.move('x', 'left')
+        self.fsm.move('o', 'left')
+        child = self.fsm.next()
+        root, after = self.pool.evaluate([self.fsm, child], 6, seed=3)
+        self.assertEqual(6, root.playouts)
+        self.assertEqual(3.0, root.average_depth)
+        self.assertEqual(2.0, after.average_depth)
+
+
+class TestParseFiles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.files = []
+        for i, line in enumerate(GAME.strip().splitlines()):
+            self.files.append(self.write('part%d.kif' % i, line + '\n'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w') as fp:
+            fp.write(text)
+        return filename
+
+    def test_load_files(self):
+        for processes in (1, 2):
+            db = Database()
+            load_files(db, self.files, processes=processes)
+            fsm = StateMachine(db)
+            fsm.store(data='')
+            self.assertEqual(['x', 'o'], fsm.roles)
+            self.assertEqual(['left', 'right'], [str(m) for m in fsm.legal_moves('x')])
+
+    def test_parse_files_positions(self):
+        for processes in (1, 2):
+            trees = parse_files(self.files[:4], processes=processes)
+            self.assertEqual(['role', 'role', 'init', 'succ'], [t.term for t in trees[:4]])
+            token = trees[2].children[0].token
+            self.assertEqual((self.files[2], 1, 8), (token.filename, token.lineno, token.column))
+            self.assertEqual('(init (step 0))\n', token.line)
+
+    def test_parse_error(self):
+        bad = self.write('bad.kif', '(role x)\n(f a ?x (g ( (h c ?y) e)))\n')
+        for processes in (1, 2):
+            with self.assertRaises(ParseError) as cm:
+                parse_files(self.files + [bad], processes=processes)
+            self.assertIn('2: (f a ?x (g ( (h c ?y) e)))', str(cm.exception))
+            self.assertEqual(bad, cm.exception.token.filename)
+
+    def test_load_files_streams(self):
+        bad = self.write('bad.kif', '(f (g)\n')
+        for processes in (1, 2):
+            db = Database()
+            with self.assertRaises(ParseError):
+                load_files(db, self.files + [bad], processes=processes)
+            self.assertEqual(2, len(db.facts[('role', 1)]))
+
+    def test_deep_terms(self):
+        deep = self.write('deep.kif', '(count %sz%s)\n' % ('(s ' * 3000, ')' * 3000))
+        for processes in (1, 2):
+            db = Database()
+            load_files(db, [deep, self.files[0]], processes=processes)
+            node = db.facts[('count', 1)][0][0]
+            for _ in range(3000):
+                self.assertEqual(('s', 1), node.predicate)
+                node = node.children[0]
+            self.assertEqual('z', node.term)
+
+    def test_define_error(self):
+        bad = self.write('bad.kif', '\n(succ ?x 4)\n')
+        with self.assertRaises(DatalogError) as cm:
+            load_files(Database(), self.files + [bad], processes=2)
+        self.assertIn('2: (succ ?x 4)', str(cm.exception))
@@ -117,3 +117,19 @@ class TestParser(unittest.TestCase):
         with self.assertRaises(ParseError) as cm:
             Parser().parse(tokens)
         self.assertEqual(str(cm.exception), errmsg)
+
+    def test_iter_parse(self):
+        tokens = ['(', 'role', 'x', ')', 'terminal', '(', 'f', '(', 'g', 'a', ')', ')']
+        seen = []
+        def stream():
+            for t in tokens:
+                seen.append(t)
+                yield MockToken(None, None, None, None, t)
+        trees = Parser().iter_parse(stream())
+        self.assertEqual('role', next(trees).term)
+        self.assertEqual(4, len(seen))
+        self.assertEqual('terminal', next(trees).term)
+        self.assertEqual(5, len(seen))
+        tree = next(trees)
+        self.assertEqual(['g'], [c.term for c in tree.children])
+        self.assertEqual([], list(trees))
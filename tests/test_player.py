@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+import unittest
+from gdl.player import Player, read_sexp, write_sexp
+
+
+GAME = '''
+(role x)
+(role o)
+(init (control x))
+(<= (legal x a) (true (control x)))
+(<= (legal x b) (true (control x)))
+(<= (legal o noop) (true (control x)))
+(<= (legal o c) (true (control o)))
+(<= (legal o d) (true (control o)))
+(<= (legal x noop) (true (control o)))
+(<= (next (picked ?m)) (does ?p ?m) (distinct ?m noop))
+(<= (next (picked ?m)) (true (picked ?m)))
+(<= (next (control o)) (true (control x)))
+(<= (next (control none)) (true (control o)))
+(<= terminal (true (control none)))
+(<= (goal ?p 50) (role ?p))
+'''
+
+
+class StuckSearch(object):
+    '''A search which only returns once it is told to stop.'''
+    def __init__(self, machine, role):
+        self.threads = []
+        self.stopped = 0
+
+    def advance(self, machine):
+        self.threads.append(threading.current_thread())
+
+    def search(self, seconds, stop=None):
+        if stop.wait(10):
+            self.stopped += 1
+        return None
+
+
+class SlowPlayer(Player):
+    '''A player which takes a second to load a game and records the threads
+    it applies moves on.
+    '''
+    def __init__(self, *args, **kwargs):
+        Player.__init__(self, *args, **kwargs)
+        self.threads = []
+
+    def _new_match(self, *args):
+        time.sleep(1)
+        return Player._new_match(self, *args)
+
+    def _update(self, machine, moves):
+        self.threads.append(threading.current_thread())
+        return Player._update(self, machine, moves)
+
+
+class TestSexp(unittest.TestCase):
+    def test_read(self):
+        self.assertEqual([['play', 'm1', ['a', ['mark', '1', '2']]]],
+                read_sexp('(PLAY m1 (a (mark 1 2)))'))
+
+    def test_read_unbalanced_error(self):
+        with self.assertRaises(ValueError):
+            read_sexp('(play m1 (a b)')
+        with self.assertRaises(ValueError):
+            read_sexp('(play m1))')
+
+    def test_write(self):
+        text = '(<= (legal x (mark ?m ?n)) (true (cell ?m ?n b)))'
+        self.assertEqual(text, write_sexp(read_sexp(text)[0]))
+
+
+class TestPlayer(unittest.TestCase):
+    def setUp(self):
+        self.player = Player(margin=0.9)
+
+    def tearDown(self):
+        self.player.close()
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_info(self):
+        self.assertEqual('((name pygdl) (status available))',
+                self.run_async(self.player.handle('(info)')))
+
+    def test_match(self):
+        async def play():
+            handle = self.player.handle
+            replies = [await handle('(start m1 x (%s) 1 1)' % GAME)]
+            replies.append(await handle('(play m1 nil)'))
+            replies.append(await handle('(play m1 (%s noop))' % replies[-1]))
+            replies.append(await handle('(stop m1 (noop c))'))
+            return replies
+        ready, first, second, done = self.run_async(play())
+        self.assertEqual('ready', ready)
+        self.assertIn(first, ('a', 'b'))
+        self.assertEqual('noop', second)
+        self.assertEqual('done', done)
+        self.assertEqual({}, self.player.matches)
+
+    def test_concurrent_matches(self):
+        async def play():
+            handle = self.player.handle
+            await asyncio.gather(*[handle('(start m%d %s (%s) 1 1)' % (i, role, GAME))
+                    for i, role in enumerate(('x', 'o', 'x'))])
+            return await asyncio.gather(*[handle('(play m%d nil)' % i) for i in range(3)])
+        moves = self.run_async(play())
+        self.assertIn(moves[0], ('a', 'b'))
+        self.assertEqual('noop', moves[1])
+        self.assertEqual(3, len(self.player.matches))
+        self.assertEqual(1, len(self.player.games))
+
+    def test_overrunning_search(self):
+        player = Player(margin=0.9, workers=1, search=StuckSearch)
+        async def play():
+            await player.handle('(start m1 x (%s) 1 1)' % GAME)
+            start = time.perf_counter()
+            first = await player.handle('(play m1 nil)')
+            second = await player.handle('(play m1 (%s noop))' % first)
+            return first, second, time.perf_counter() - start
+        try:
+            first, second, elapsed = self.run_async(play())
+        finally:
+            player.close()
+        self.assertEqual('a', first)
+        self.assertEqual('noop', second)
+        self.assertLess(elapsed, 2.0)
+        search = player.matches['m1'].search
+        self.assertNotIn(threading.main_thread(), search.threads)
+        self.assertGreaterEqual(search.stopped, 2)
+
+    def test_slow_start(self):
+        player = SlowPlayer(margin=0.5, search=StuckSearch)
+        async def play():
+            start = time.perf_counter()
+            ready = await player.handle('(start m1 x (%s) 0.8 1)' % GAME)
+            elapsed = time.perf_counter() - start
+            first = await player.handle('(play m1 nil)')
+            second = await player.handle('(play m1 (%s noop))' % first)
+            return ready, elapsed, first, second
+        try:
+            ready, elapsed, first, second = self.run_async(play())
+        finally:
+            player.close()
+        self.assertEqual('ready', ready)
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual('a', first)
+        self.assertEqual('noop', second)
+        self.assertEqual({}, player.starting)
+        self.assertEqual(1, len(player.threads))
+        self.assertNotIn(threading.main_thread(), player.threads)
+
+    def test_abort(self):
+        async def play():
+            await self.player.handle('(start m1 o (%s) 1 1)' % GAME)
+            return await self.player.handle('(abort m1)')
+        self.assertEqual('done', self.run_async(play()))
+        self.assertEqual({}, self.player.matches)
+
+    def test_unknown_message_error(self):
+        with self.assertRaises(ValueError):
+            self.run_async(self.player.handle('(dance m1)'))
+
+    def test_http(self):
+        async def request():
+            server = await self.player.serve(port=0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            body = b'(info)'
+            writer.write(b'POST / HTTP/1.0\r\nContent-Type: text/acl\r\n'
+                         b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+            response = await reader.read()
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return response
+        response = self.run_async(request())
+        self.assertTrue(response.startswith(b'HTTP/1.0 200 OK\r\n'))
+        self.assertTrue(response.endswith(b'\r\n\r\n((name pygdl) (status available))'))
@@ -0,0 +1,119 @@
+import random
+import unittest
+from gdl import StateMachine
+from gdl.search import AlphaBeta, MCTS
+from gdl.transposition import TranspositionTable
+
+
+# x picks 'a' (a gamble which o decides) or 'b' (a safe draw)
+GAME = '''
+(role x)
+(role o)
+(init (control x))
+(<= (legal x a) (true (control x)))
+(<= (legal x b) (true (control x)))
+(<= (legal o noop) (true (control x)))
+(<= (legal o c) (true (control o)))
+(<= (legal o d) (true (control o)))
+(<= (legal x noop) (true (control o)))
+(<= (next (picked ?m)) (does ?p ?m) (distinct ?m noop))
+(<= (next (picked ?m)) (true (picked ?m)))
+(<= (next (control o)) (true (control x)))
+(<= (next (control none)) (true (control o)))
+(<= terminal (true (control none)))
+(<= (goal x 100) (true (picked a)) (true (picked c)))
+(<= (goal x 0) (true (picked a)) (true (picked d)))
+(<= (goal x 50) (true (picked b)))
+(<= (goal o 0) (true (picked a)) (true (picked c)))
+(<= (goal o 100) (true (picked a)) (true (picked d)))
+(<= (goal o 50) (true (picked b)))
+'''
+
+
+def new_game():
+    fsm = StateMachine()
+    fsm.store(data=GAME)
+    return fsm
+
+
+class TestAlphaBeta(unittest.TestCase):
+    def test_search(self):
+        search = AlphaBeta(new_game(), 'x')
+        self.assertEqual('b', str(search.search(depth=5)))
+        self.assertEqual(50, search.value)
+        self.assertEqual(2, search.depth)
+        self.assertGreater(search.stats.nodes, 0)
+        self.assertGreater(search.stats.tree_size, 0)
+        self.assertGreater(search.stats.memory, 0)
+        entry = search.transpositions.get(search.machine.state())
+        self.assertEqual(2, len(entry.successors))
+
+    def test_empty_transposition_table(self):
+        tt = TranspositionTable(size=10)
+        self.assertIs(tt, AlphaBeta(new_game(), 'x', transpositions=tt).transpositions)
+        self.assertIs(tt, MCTS(new_game(), 'x', transpositions=tt).transpositions)
+
+    def test_search_other_role(self):
+        fsm = new_game()
+        fsm.move('x', 'a')
+        fsm.move('o', 'noop')
+        search = AlphaBeta(fsm.next(), 'o')
+        self.assertEqual('d', str(search.search(seconds=10)))
+        self.assertEqual(100, search.value)
+
+    def test_search_time_budget(self):
+        search = AlphaBeta(new_game(), 'x')
+        self.assertIsNone(search.search(seconds=0))
+        self.assertEqual(0, search.depth)
+
+    def test_search_no_limit_error(self):
+        with self.assertRaises(ValueError):
+            AlphaBeta(new_game(), 'x').search()
+
+    def test_advance(self):
+        fsm = new_game()
+        search = AlphaBeta(fsm, 'x')
+        search.search(depth=5)
+        fsm.move('x', 'b')
+        fsm.move('o', 'noop')
+        search.advance(fsm.next())
+        nodes = search.stats.nodes
+        self.assertEqual('noop', str(search.search(depth=5)))
+        self.assertEqual(1, search.stats.nodes - nodes)
+
+
+class TestMCTS(unittest.TestCase):
+    def test_search(self):
+        search = MCTS(new_game(), 'x', rng=random.Random(0))
+        self.assertEqual('b', str(search.search(iterations=200)))
+        self.assertEqual(200, search.root.visits)
+        self.assertEqual(7, search.stats.tree_size)
+        self.assertGreater(search.stats.nodes, 200)
+        self.assertGreater(search.stats.memory, 0)
+        self.assertGreater(search.stats.nodes_per_sec, 0)
+
+    def test_search_time_budget(self):
+        search = MCTS(new_game(), 'x', rng=random.Random(0))
+        search.search(seconds=0.05)
+        self.assertGreater(search.root.visits, 0)
+
+    def test_search_no_limit_error(self):
+        with self.assertRaises(ValueError):
+            MCTS(new_game(), 'x').search()
+
+    def test_advance_reuses_tree(self):
+        fsm = new_game()
+        search = MCTS(fsm, 'x', rng=random.Random(0))
+        search.search(iterations=50)
+        fsm.move('x', 'a')
+        fsm.move('o', 'noop')
+        search.advance(fsm.next())
+        self.assertEqual(3, search.stats.tree_size)
+        self.assertGreater(search.root.visits, 0)
+        self.assertIn(str(search.search(iterations=10)), ('noop',))
+
+    def test_search_terminal(self):
+        fsm = new_game()
+        fsm.apply({'x': 'b', 'o': 'noop'})
+        fsm.apply({'x': 'noop', 'o': 'c'})
+        self.assertIsNone(MCTS(fsm, 'x').search(iterations=5))
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+from gdl import Database, Lexer, Parser
+import gdl.snapshot
+from gdl.snapshot import Snapshot, write_snapshot
+
+
+def load(filename):
+    db = Database()
+    with open(filename) as fp:
+        for tree in Parser().iter_parse(Lexer().iter_lex(file=fp)):
+            db.define(tree)
+    return db
+
+
+def parse(text):
+    return Parser.run_parse(Lexer.run_lex(data=text))[0]
+
+
+def answers(db, text):
+    results = db.query(parse(text))
+    if type(results) is not list:
+        return results
+    return sorted(tuple(sorted((k, str(v)) for k, v in d.items())) for d in results)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'facts.gdls')
+        self.db = load('samples/test.kif')
+        write_snapshot(self.path, self.db)
+        self.snapshot = Snapshot(self.path)
+
+    def tearDown(self):
+        self.snapshot.close()
+        shutil.rmtree(self.directory)
+
+    def test_relations(self):
+        links = self.snapshot.relations[('link', 2)]
+        self.assertEqual(3, len(links))
+        self.assertEqual([['1', '2'], ['2', '3'], ['3', '4']],
+                [[str(arg) for arg in args] for args in links])
+        cell = self.snapshot.relations[('true', 1)][0][0]
+        self.assertEqual(('cell', 3), cell.predicate)
+        self.assertIsNone(self.snapshot.symbol_id('5'))
+
+    def test_candidates(self):
+        links = self.snapshot.relations[('link', 2)]
+        self.assertEqual([['2', '3']], [[str(a) for a in args] \
+                for args in links.candidates(parse('(link 2 ?y)').children)])
+        query = parse('(link ?x ?y)').children
+        self.assertEqual([['3', '4']], [[str(a) for a in args] \
+                for args in links.candidates(query, {'?y': parse('4')})])
+        self.assertIs(links, links.candidates(query))
+        self.assertEqual([], links.candidates(parse('(link 9 ?y)').children))
+
+    def test_compound_pattern(self):
+        db = Database()
+        for text in ('(p (f a))', '(p (g b))'):
+            db.define(parse(text))
+        path = os.path.join(self.directory, 'compound.gdls')
+        write_snapshot(path, db)
+        with Snapshot(path) as snapshot:
+            db.attach(snapshot)
+            self.assertEqual([(('?x', 'a'),)], answers(db, '(p (f ?x))'))
+            self.assertTrue(answers(db, '(p (g b))'))
+
+    def test_decoded_in_memory(self):
+        in_place = gdl.snapshot._IN_PLACE
+        gdl.snapshot._IN_PLACE = False
+        try:
+            with Snapshot(self.path) as snapshot:
+                links = snapshot.relations[('link', 2)]
+                self.assertEqual([['1', '2'], ['2', '3'], ['3', '4']],
+                        [[str(arg) for arg in args] for args in links])
+                self.assertEqual([['2', '3']], [[str(a) for a in args] \
+                        for args in links.candidates(parse('(link 2 ?y)').children)])
+        finally:
+            gdl.snapshot._IN_PLACE = in_place
+
+    def test_attach(self):
+        db = load('samples/test.kif')
+        for pred in self.snapshot.relations:
+            db.facts.pop(pred)
+        db.attach(self.snapshot)
+        for text in ('(path 1 ?y)', '(not-path ?x ?y)', '(diff 1 ?y)', '(path 1 4)',
+                '(legal x ?x)', '(p ?x)', '(not-y ?x)', '(valid? ?x ?y)'):
+            self.assertEqual(answers(self.db, text), answers(db, text))
+        with self.assertRaises(TypeError):
+            db.define(parse('(link 4 5)'))
+
+    def test_not_a_snapshot_error(self):
+        with self.assertRaises(ValueError):
+            Snapshot('samples/test.kif')
@@ -0,0 +1,87 @@
+import pickle
+import threading
+import unittest
+from gdl.ast import ASTNode
+from gdl.state import PropositionTable
+
+
+def make_node(term, children=None):
+    node = ASTNode.new(term)
+    node.children = [make_node(c) if isinstance(c, str) else c for c in children or []]
+    return node
+
+
+class TestPropositionTable(unittest.TestCase):
+    def test_intern(self):
+        table = PropositionTable()
+        a = table.intern(make_node('cell', ['1', '1', 'b']))
+        b = table.intern(make_node('control', ['x']))
+        self.assertEqual(0, a)
+        self.assertEqual(1, b)
+        self.assertEqual(a, table.intern(make_node('cell', ['1', '1', 'b'])))
+        self.assertEqual(2, len(table))
+        self.assertEqual(['(cell 1 1 b)', '(control x)'], table.texts)
+        self.assertEqual('(control x)', table.move(make_node('control', ['x'])).text)
+
+    def test_intern_from_threads(self):
+        table = PropositionTable()
+        nodes = [make_node('cell', [str(x)]) for x in range(2000)]
+        threads = [threading.Thread(target=lambda: [table.intern(n) for n in nodes]) \
+                for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(2000, len(table))
+        for node in nodes:
+            self.assertEqual(str(node), table.texts[table.intern(node)])
+        copy = pickle.loads(pickle.dumps(table))
+        self.assertEqual(table.texts, copy.texts)
+        self.assertEqual(len(table), copy.intern(make_node('new')))
+
+    def test_key_does_not_intern(self):
+        table = PropositionTable()
+        id = table.intern(make_node('cell', ['a']))
+        self.assertEqual(table.keys[id], table.key(make_node('cell', ['a'])))
+        key = table.key(make_node('cell', ['b']))
+        self.assertEqual(1, len(table))
+        self.assertEqual(key, table.keys[table.intern(make_node('cell', ['b']))])
+
+    def test_zobrist_keys_agree_between_tables(self):
+        one, two = PropositionTable(), PropositionTable()
+        one.intern(make_node('a'))
+        id1 = one.intern(make_node('cell', ['1', '2']))
+        id2 = two.intern(make_node('cell', ['1', '2']))
+        self.assertEqual(one.keys[id1], two.keys[id2])
+        self.assertNotEqual(one.keys[0], one.keys[id1])
+
+    def test_encode_is_order_independent(self):
+        table = PropositionTable()
+        nodes = [make_node('cell', [x]) for x in ('a', 'b', 'c')]
+        self.assertEqual(table.encode(nodes), table.encode(reversed(nodes)))
+        self.assertNotEqual(table.encode(nodes), table.encode(nodes[:2]))
+
+    def test_incremental_hash(self):
+        table = PropositionTable()
+        before = table.encode([make_node('cell', [x]) for x in ('a', 'b', 'c')])
+        after = [make_node('cell', [x]) for x in ('b', 'c', 'd')]
+        ids = [table.intern(node) for node in after]
+        state = before.transition(ids, table)
+        self.assertEqual(table.encode(after).hash, state.hash)
+        self.assertEqual(table.encode(after), state)
+
+    def test_bytes_round_trip(self):
+        table = PropositionTable()
+        state = table.encode([make_node('cell', [x]) for x in ('a', 'b', 'c')])
+        data = state.to_bytes()
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(12, len(data))
+        self.assertEqual(state, table.from_bytes(data))
+        self.assertEqual(['(cell a)', '(cell b)', '(cell c)'],
+                [str(term) for term in table.decode(state)])
+
+    def test_empty_state(self):
+        table = PropositionTable()
+        state = table.encode([])
+        self.assertEqual(0, state.hash)
+        self.assertEqual(state, table.from_bytes(state.to_bytes()))
@@ -336,3 +336,285 @@ class TestStateMachine(unittest.TestCase):
         '''
         three.store(data=data)
         self.assertNotEqual(hash(two), hash(three))
+
+    PLAYOUT_GAME = '''
+    (role x)
+    (role o)
+    (init (step 0))
+    (succ 0 1) (succ 1 2) (succ 2 3)
+    (<= (legal ?player left) (role ?player))
+    (<= (legal ?player right) (role ?player))
+    (<= (next (step ?y)) (true (step ?x)) (succ ?x ?y))
+    (<= (next (last ?player ?move)) (does ?player ?move))
+    (<= terminal (true (step 3)))
+    (<= (goal ?player 100) (true (last ?player left)))
+    (<= (goal ?player 0) (true (last ?player right)))
+    '''
+
+    def test_playout(self):
+        import random
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        goals, depth = fsm.playout(random.Random(1))
+        self.assertEqual(3, depth)
+        self.assertEqual(set(['x', 'o']), set(goals))
+        for score in goals.values():
+            self.assertIn(score, (0, 100))
+        states = [str(x[0]) for x in fsm.db.facts[('true', 1)]]
+        self.assertEqual(['(step 0)'], states)
+
+    def test_playout_is_reproducible(self):
+        import random
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        one = [fsm.depth_charge(random.Random(7)) for _ in range(3)]
+        two = [fsm.depth_charge(random.Random(7)) for _ in range(3)]
+        self.assertEqual(one, two)
+
+    def test_playout_no_legal_moves_error(self):
+        fsm = StateMachine()
+        data = '''
+        (role x)
+        (init (cell a))
+        (<= (legal x ?x) (true (cell b)) (true ?x))
+        (<= (next ?x) (true ?x))
+        (<= terminal (true (cell b)))
+        '''
+        fsm.store(data=data)
+        with self.assertRaises(GameError):
+            fsm.playout()
+
+    def test_run_playouts(self):
+        import random
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        report = fsm.run_playouts(4, random.Random(3))
+        self.assertEqual(4, report.playouts)
+        self.assertEqual(3.0, report.average_depth)
+        self.assertGreater(report.playouts_per_sec, 0)
+        self.assertLessEqual(report.average_goal('x'), 100)
+
+    def test_next_keeps_static_derived_facts(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME + '(<= (later ?x ?z) (succ ?x ?y) (succ ?y ?z))')
+        query = ASTNode.new('later')
+        query.children = [ASTNode.new('?x'), ASTNode.new('?z')]
+        fsm.db.query(query)
+        fsm.move('x', 'left')
+        fsm.move('o', 'right')
+        next = fsm.next()
+        self.assertIn(('later', 2), next.db.derived_facts)
+        self.assertNotIn(('next', 1), next.db.derived_facts)
+
+    def test_state_incremental_hash(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        fsm.state()
+        fsm.move('x', 'left')
+        fsm.move('o', 'right')
+        next = fsm.next()
+        fresh = StateMachine()
+        fresh.store(data=self.PLAYOUT_GAME)
+        fresh = fresh.restore(fresh.propositions.encode(
+            [x[0] for x in next.db.facts[('true', 1)]]))
+        self.assertEqual(next.state().hash, fresh.state().hash)
+        self.assertEqual(hash(next), hash(fresh))
+
+    def test_restore(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        fsm.move('x', 'left')
+        fsm.move('o', 'right')
+        next = fsm.next()
+        data = next.state().to_bytes()
+        restored = fsm.restore(fsm.propositions.from_bytes(data))
+        states = sorted(str(x[0]) for x in restored.db.facts[('true', 1)])
+        self.assertEqual(['(last o right)', '(last x left)', '(step 1)'], states)
+        self.assertEqual({'x': 100, 'o': 0}, restored.score())
+        self.assertEqual(hash(next), hash(restored))
+
+    def test_get_all_next_states(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        fsm.state()
+        results = fsm.get_all_next_states()
+        joints = [tuple(str(m) for m in joint) for joint, _ in results]
+        self.assertEqual([('left', 'left'), ('left', 'right'),
+                          ('right', 'left'), ('right', 'right')], joints)
+        for joint, next in results:
+            o, x = [str(m) for m in joint]
+            states = sorted(str(f[0]) for f in next.db.facts[('true', 1)])
+            self.assertEqual(['(last o %s)' % o, '(last x %s)' % x, '(step 1)'], states)
+            fresh = StateMachine()
+            fresh.store(data=self.PLAYOUT_GAME)
+            fresh.move('x', x)
+            fresh.move('o', o)
+            self.assertEqual(hash(fresh.next()), hash(next))
+        states = [str(x[0]) for x in fsm.db.facts[('true', 1)]]
+        self.assertEqual(['(step 0)'], states)
+
+    def test_get_all_next_states_no_legal_moves_error(self):
+        fsm = StateMachine()
+        data = '''
+        (role x)
+        (init (cell a))
+        (<= (legal x ?x) (true (cell b)) (true ?x))
+        (<= (next ?x) (true ?x))
+        '''
+        fsm.store(data=data)
+        with self.assertRaises(GameError):
+            fsm.get_all_next_states()
+
+    def test_apply_and_undo(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        before = hash(fsm)
+        fsm.apply({'x': 'left', 'o': 'right'})
+        self.assertEqual({'x': 100, 'o': 0}, fsm.score())
+        size = len(fsm.propositions)
+        middle = hash(fsm)
+        self.assertEqual(size, len(fsm.propositions))
+        fsm.apply((ASTNode.new('right'), ASTNode.new('right')))
+        self.assertEqual({'x': 0, 'o': 0}, fsm.score())
+        self.assertFalse(fsm.is_terminal())
+        fsm.apply({'x': 'left', 'o': 'left'})
+        self.assertTrue(fsm.is_terminal())
+
+        fsm.undo()
+        self.assertFalse(fsm.is_terminal())
+        fsm.undo()
+        self.assertEqual(middle, hash(fsm))
+        self.assertEqual({'x': 100, 'o': 0}, fsm.score())
+        fsm.undo()
+        self.assertEqual(before, hash(fsm))
+        self.assertEqual(None, fsm.score())
+        self.assertEqual(['(step 0)'], [str(x[0]) for x in fsm.db.facts[('true', 1)]])
+
+    def test_apply_known_successor(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        fsm.apply({'x': 'left', 'o': 'right'})
+        successor = fsm.state()
+        fsm.undo()
+        fsm._query_next = None
+        fsm.apply({'x': 'left', 'o': 'right'}, successor)
+        self.assertEqual(successor, fsm.state())
+        self.assertEqual({'x': 100, 'o': 0}, fsm.score())
+        fsm.undo()
+        self.assertEqual(None, fsm.score())
+
+    def test_apply_missing_player_error(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        with self.assertRaises(GameError):
+            fsm.apply({'x': 'left'})
+        with self.assertRaises(GameError):
+            fsm.apply(('left',))
+        with self.assertRaises(GameError):
+            fsm.apply(('left', 'left', 'left'))
+
+    def test_undo_nothing_error(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        with self.assertRaises(GameError):
+            fsm.undo()
+
+    def test_legal_moves(self):
+        fsm = StateMachine()
+        data = '''
+        (role x)
+        (role o)
+        (init 1) (init 2) (init 3) (init 4)
+        (even 2) (even 4)
+        (odd 1) (odd 3)
+        (<= (legal x (mark ?x)) (true ?x) (even ?x))
+        (<= (legal o (mark ?x)) (true ?x) (odd ?x))
+        '''
+        fsm.store(data=data)
+        moves = fsm.legal_moves('x')
+        self.assertEqual(['(mark 2)', '(mark 4)'], [str(m) for m in moves])
+        self.assertEqual(moves, fsm.legal_moves()['x'])
+        self.assertIs(moves[0], fsm.legal_moves('x')[0])
+        self.assertEqual([], fsm.legal_moves('z'))
+        fsm.move('x', moves[1])
+        fsm.move('o', '(mark 3)')
+        query = ASTNode.new('does')
+        query.children = [ASTNode.new('x'), ASTNode.new('?m')]
+        self.assertEqual('(mark 4)', str(fsm.db.query(query)[0]['?m']))
+
+    def test_move_object_illegal_error(self):
+        fsm = StateMachine()
+        data = '''
+        (role x)
+        (init 1) (init 2)
+        (<= (legal x ?x) (true ?x))
+        (<= (next ?x) (true ?x))
+        '''
+        fsm.store(data=data)
+        move = fsm.legal_moves('x')[0]
+        fsm.move('x', move)
+        next = fsm.next()
+        next.db.replace_facts('true', 1, [])
+        with self.assertRaises(GameError):
+            next.move('x', move)
+
+    def test_score_and_terminal_many(self):
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        states = [fsm.state()]
+        for moves in (('left', 'right'), ('right', 'right'), ('left', 'left')):
+            fsm.apply(dict(zip(('o', 'x'), moves)))
+            states.append(fsm.state())
+        self.assertEqual([0, 0, 0, 1], list(fsm.terminal_many(states)))
+        scores = fsm.score_many(states)
+        self.assertEqual([-1, 100, 0, 100], list(scores['o']))
+        self.assertEqual([-1, 0, 0, 100], list(scores['x']))
+        self.assertEqual([-1, 0, 0, 100], list(fsm.score_many(states, 'x')))
+        self.assertEqual({'x': 100, 'o': 100}, fsm.score())
+        with self.assertRaises(GameError):
+            fsm.score_many(states, 'z')
+
+    def test_random_legal_move(self):
+        import random
+        fsm = StateMachine()
+        fsm.store(data=self.PLAYOUT_GAME)
+        rng = random.Random(0)
+        moves = [str(fsm.random_legal_move('x', rng)) for _ in range(1000)]
+        self.assertEqual(set(str(m) for m in fsm.legal_moves('x')), set(moves))
+        self.assertTrue(400 < moves.count('left') < 600)
+        fsm._random_joint_move(rng)
+        self.assertEqual(['o', 'x'], sorted(p.term for p, _ in fsm.db.facts[('does', 2)]))
+        with self.assertRaises(GameError):
+            fsm.random_legal_move('z', rng)
+        fsm = StateMachine()
+        fsm.store(data='(role z) (init (s 0)) (<= (legal z a) (true (s 1)))')
+        self.assertIsNone(fsm.random_legal_move('z', rng))
+
+    def test_game_new_match(self):
+        from gdl import Game
+        game = Game(data=self.PLAYOUT_GAME)
+        self.assertEqual(['x', 'o'], game.roles)
+        one, two = game.new_match(), game.new_match()
+        self.assertIs(game, one.game)
+        self.assertIs(game.propositions, two.propositions)
+        self.assertIs(game.db.rules[('next', 1)], one.db.rules[('next', 1)])
+        one.move('x', 'left')
+        one.move('o', 'left')
+        next = one.next()
+        self.assertEqual({'x': 100, 'o': 100}, next.score())
+        self.assertEqual(None, two.score())
+        self.assertNotIn(('does', 2), two.db.facts)
+        self.assertEqual(['(step 0)'], [str(x[0]) for x in game.db.facts[('true', 1)]])
+
+    def test_game_static_facts(self):
+        from gdl import Game
+        game = Game(data=self.PLAYOUT_GAME + '(<= (later ?x ?z) (succ ?x ?y) (succ ?y ?z))')
+        self.assertEqual(set([('legal', 2), ('later', 2)]), set(game.static_predicates()))
+        self.assertIn(('later', 2), game.db.derived_facts)
+        self.assertIn(('later', 2), game.new_match().db.derived_facts)
+        self.assertNotIn(('next', 1), game.db.derived_facts)
+
+    def test_game_no_roles_error(self):
+        from gdl import Game
+        with self.assertRaises(GameError):
+            Game(data='(init (cell a))')
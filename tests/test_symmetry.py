@@ -0,0 +1,115 @@
+import random
+import unittest
+from gdl.search import AlphaBeta, MCTS
+from gdl.state_machine import Game
+from gdl.symmetry import Symmetries
+
+
+# the two end cells of a row of three are symmetric
+GAME = '''
+(role x)
+(init (cell 1 b))
+(init (cell 2 b))
+(init (cell 3 b))
+(<= (legal x (mark ?n)) (true (cell ?n b)))
+(<= (next (cell ?n x)) (does x (mark ?n)))
+(<= (next (cell ?n ?w)) (true (cell ?n ?w)) (distinct ?w b))
+(<= (next (cell ?n b)) (true (cell ?n b)) (not (does x (mark ?n))))
+(<= terminal (true (cell 2 x)))
+(<= terminal (true (cell 1 x)) (true (cell 3 x)))
+(<= (goal x 100) (true (cell 1 x)) (true (cell 3 x)))
+(<= (goal x 0) (true (cell 2 x)))
+'''
+
+
+# a 3000-deep counter which never changes, next to two symmetric cells
+COUNTER = '(s ' * 3000 + '0' + ')' * 3000
+DEEP_GAME = '''
+(role x)
+(init (count %s))
+(init (cell a))
+(init (cell b))
+(<= (legal x (mark ?c)) (true (cell ?c)))
+(<= (next (count ?n)) (true (count ?n)))
+(<= (next (cell ?c)) (true (cell ?c)))
+(<= terminal (true (count 0)))
+(<= (goal x 100) (true (count %s)))
+''' % (COUNTER, COUNTER)
+
+
+class TestSymmetries(unittest.TestCase):
+    def setUp(self):
+        self.game = Game(data=GAME)
+        self.symmetries = Symmetries(self.game)
+
+    def marked(self, n):
+        fsm = self.game.new_match()
+        fsm.apply({'x': '(mark %d)' % n})
+        return fsm
+
+    def test_find(self):
+        self.assertEqual(2, len(self.symmetries))
+        self.assertEqual({}, self.symmetries.symmetries[0].mapping)
+        self.assertEqual({'1': '3', '3': '1'}, self.symmetries.symmetries[1].mapping)
+
+    def test_deep_terms(self):
+        game = Game(data=DEEP_GAME)
+        symmetries = Symmetries(game)
+        self.assertEqual({'a': 'b', 'b': 'a'}, symmetries.symmetries[1].mapping)
+        fsm = game.new_match()
+        self.assertEqual(fsm.state(), symmetries.canonical(fsm.state())[0])
+        fsm.apply({'x': '(mark a)'})
+        self.assertEqual({'x': 100}, fsm.score())
+
+    def test_no_symmetries(self):
+        game = Game(data=GAME + '(<= (goal x 50) (true (cell 1 b)))')
+        self.assertEqual(1, len(Symmetries(game)))
+
+    def test_canonical(self):
+        left, right = self.marked(1).state(), self.marked(3).state()
+        self.assertNotEqual(left, right)
+        canonical, symmetry = self.symmetries.canonical(left)
+        self.assertEqual(canonical, self.symmetries.canonical(right)[0])
+        self.assertEqual(canonical, symmetry.map_state(left, self.game.propositions))
+        middle = self.marked(2).state()
+        self.assertEqual(middle, self.symmetries.canonical(middle)[0])
+
+    def test_map_move(self):
+        table = self.game.propositions
+        fsm = self.game.new_match()
+        moves = fsm.legal_moves('x')
+        symmetry = self.symmetries.symmetries[1]
+        self.assertEqual(['(mark 3)', '(mark 2)', '(mark 1)'],
+                [str(symmetry.map_move(move, table)) for move in moves])
+        self.assertIs(moves[0], symmetry.inverse.map_move(moves[2], table))
+
+    def test_canonicalize_undo(self):
+        fsm = self.game.new_match()
+        fsm.apply({'x': '(mark 1)'})
+        state = fsm.state()
+        fsm.apply({'x': '(mark 3)'})
+        fsm.undo()
+        fsm.canonicalize(self.symmetries)
+        self.assertEqual(self.symmetries.canonical(state)[0], fsm.state())
+        self.assertEqual(2, len(fsm.legal_moves('x')))
+        fsm.undo()
+        self.assertEqual(3, len(fsm.legal_moves('x')))
+
+    def test_alphabeta(self):
+        for n in (1, 3):
+            search = AlphaBeta(self.marked(n), 'x', symmetries=self.symmetries)
+            self.assertEqual('(mark %d)' % (4 - n), str(search.search(depth=3)))
+            self.assertEqual(100, search.value)
+
+    def test_alphabeta_shares_entries(self):
+        plain = AlphaBeta(self.game.new_match(), 'x')
+        plain.search(depth=3)
+        search = AlphaBeta(self.game.new_match(), 'x', symmetries=self.symmetries)
+        self.assertIn(str(search.search(depth=3)), ('(mark 1)', '(mark 3)'))
+        self.assertLess(len(search.transpositions), len(plain.transpositions))
+
+    def test_mcts(self):
+        for n in (1, 3):
+            search = MCTS(self.marked(n), 'x', rng=random.Random(0),
+                    symmetries=self.symmetries)
+            self.assertEqual('(mark %d)' % (4 - n), str(search.search(iterations=50)))
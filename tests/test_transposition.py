@@ -0,0 +1,92 @@
+import unittest
+from gdl import StateMachine
+from gdl.ast import ASTNode
+from gdl.state import PropositionTable
+from gdl.transposition import Entry, TranspositionTable
+
+
+GAME = '''
+(role x)
+(role o)
+(init (step 0))
+(succ 0 1) (succ 1 2)
+(<= (legal ?player left) (role ?player))
+(<= (legal ?player right) (role ?player))
+(<= (next (step ?y)) (true (step ?x)) (succ ?x ?y))
+(<= terminal (true (step 2)))
+(<= (goal ?player 50) (role ?player))
+'''
+
+
+def make_state(table, *terms):
+    return table.encode([ASTNode.new(term) for term in terms])
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_lru_eviction(self):
+        table = PropositionTable()
+        tt = TranspositionTable(size=2)
+        a, b, c = [make_state(table, x) for x in ('a', 'b', 'c')]
+        for state in (a, b):
+            tt.put(Entry(state))
+        tt.get(a)
+        tt.put(Entry(c))
+        self.assertEqual(2, len(tt))
+        self.assertIn(a, tt)
+        self.assertNotIn(b, tt)
+        self.assertEqual(1, tt.evictions)
+
+    def test_depth_preferred_replacement(self):
+        table = PropositionTable()
+        tt = TranspositionTable(size=1, policy=TranspositionTable.DEPTH)
+        a, b, c = [make_state(table, x) for x in ('a', 'b', 'c')]
+        self.assertTrue(tt.put(Entry(a, depth=3)))
+        self.assertFalse(tt.put(Entry(b, depth=2)))
+        self.assertIn(a, tt)
+        self.assertTrue(tt.put(Entry(c, depth=3)))
+        self.assertIn(c, tt)
+        self.assertEqual(1, len(tt))
+        self.assertEqual(1, tt.evictions)
+
+    def test_unknown_policy_error(self):
+        with self.assertRaises(ValueError):
+            TranspositionTable(policy='fifo')
+
+    def test_hit_rate(self):
+        table = PropositionTable()
+        tt = TranspositionTable()
+        a = make_state(table, 'a')
+        self.assertIsNone(tt.get(a))
+        tt.put(Entry(a))
+        self.assertIsNotNone(tt.get(a))
+        self.assertIsNotNone(tt.get(a))
+        self.assertAlmostEqual(2 / 3, tt.hit_rate)
+
+    def test_lookup(self):
+        fsm = StateMachine()
+        fsm.store(data=GAME)
+        tt = TranspositionTable()
+        entry = tt.lookup(fsm)
+        self.assertFalse(entry.terminal)
+        legal = {p: [str(m) for m in moves] for p, moves in entry.legal.items()}
+        self.assertEqual({'x': ['left', 'right'], 'o': ['left', 'right']}, legal)
+        fsm.move('x', 'left')
+        fsm.move('o', 'left')
+        next = fsm.next()
+        entry.successors[('left', 'left')] = next.state()
+        self.assertIs(entry, tt.lookup(fsm))
+
+        fsm.move('x', 'right')
+        fsm.move('o', 'right')
+        other = fsm.next()
+        self.assertIs(tt.lookup(next), tt.lookup(other))
+        self.assertEqual(2, tt.misses)
+        self.assertEqual(2, tt.hits)
+
+    def test_lookup_terminal(self):
+        fsm = StateMachine()
+        fsm.store(data=GAME.replace('(step 2)', '(step 0)'))
+        entry = TranspositionTable().lookup(fsm)
+        self.assertTrue(entry.terminal)
+        self.assertEqual({'x': 50, 'o': 50}, entry.goals)
+        self.assertIsNone(entry.legal)